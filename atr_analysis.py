@@ -6,14 +6,33 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, UTC
 import logging
+import hashlib
+import time
+import threading
+from collections import OrderedDict
 import yfinance as yf
-from typing import Tuple
+from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from indicators import atr_wilder
+
+try:
+    import talib
+except ImportError:  # fall back to the kernel in indicators.py
+    talib = None
 
 # Set up logging
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+FIVE_MINUTE_SECONDS = 300
+ATR_CACHE_SIZE = 256
+_atr_cache = OrderedDict()
+FRAME_CACHE_SIZE = 32
+# (product_id, days, 5-minute bar bucket) -> DataFrame; the batch fetch fills it from threads
+_frame_cache = OrderedDict()
+_frame_cache_lock = threading.Lock()
+
 def get_perp_product(product_id):
     """Convert spot product ID to perpetual futures product ID"""
     perp_map = {
@@ -26,7 +45,31 @@ def get_perp_product(product_id):
     return perp_map.get(product_id, 'BTC-PERP-INTX')
 
 def fetch_historical_data(cb, product_id, days=30):
-    """Fetch historical data for the specified product over the given number of days"""
+    """Fetch historical data for the specified product over the given number of days
+    
+    Results are memoized in-process until the next 5-minute bar opens; the raw candles
+    are also cached on disk by HistoricalData.
+    """
+    # Candles are public market data, so the key leaves out `cb` (and doesn't keep it alive)
+    key = (product_id, days, int(time.time()) // FIVE_MINUTE_SECONDS)
+    with _frame_cache_lock:
+        df = _frame_cache.get(key)
+        if df is not None:
+            _frame_cache.move_to_end(key)
+    
+    if df is None:
+        df = _fetch_historical_data_uncached(cb, product_id, days)
+        if df.empty:  # a failed fetch is retried on the next call
+            return df
+        with _frame_cache_lock:
+            _frame_cache[key] = df
+            if len(_frame_cache) > FRAME_CACHE_SIZE:
+                _frame_cache.popitem(last=False)
+    
+    # Callers add columns to the frame, so never hand out the cached instance
+    return df.copy()
+
+def _fetch_historical_data_uncached(cb, product_id, days):
     now = datetime.now(UTC)
     start = now - timedelta(days=days)
     end = now
@@ -40,24 +83,23 @@ def fetch_historical_data(cb, product_id, days=30):
         logger.info(f"Converting {product_id} to perpetual futures product ID: {perp_product}")
         product_id = perp_product
     
-    raw_data = cb.historical_data.get_historical_data(product_id, start, end, granularity)
+    raw_data = cb.historical_data.get_historical_columns(product_id, start, end, granularity)
     
     # Check if we got any data
-    if not raw_data:
+    if not len(raw_data['start']):
         logger.error(f"No data returned for {product_id}")
         return pd.DataFrame()
     
-    df = pd.DataFrame(raw_data)
+    df = pd.DataFrame(raw_data, copy=False)
     
-    # Convert string columns to numeric
-    numeric_columns = ['open', 'high', 'low', 'close', 'volume']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # The columns arrive already parsed. float32 is ample precision for ATR/ATR% and
+    # halves the memory traffic of the indicator passes
+    numeric_columns = [col for col in ['open', 'high', 'low', 'close', 'volume'] if col in df.columns]
+    df[numeric_columns] = df[numeric_columns].astype(np.float32)
     
     # Handle timestamp - convert Unix timestamp to datetime
     if 'start' in df.columns:
-        df['start'] = pd.to_datetime(pd.to_numeric(df['start']), unit='s', utc=True)        
+        df['start'] = pd.to_datetime(df['start'], unit='s', utc=True)
         df.set_index('start', inplace=True)
     elif 'timestamp' in df.columns:
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
@@ -68,21 +110,70 @@ def fetch_historical_data(cb, product_id, days=30):
     
     return df
 
+def fetch_historical_data_batch(cb, product_ids, days=30):
+    """Fetch historical data for several products concurrently, keyed by product ID"""
+    if not product_ids:
+        return {}
+    
+    # Each fetch is blocked on REST latency, so threads overlap the waits
+    with ThreadPoolExecutor(max_workers=min(10, len(product_ids))) as executor:
+        frames = executor.map(lambda product_id: fetch_historical_data(cb, product_id, days), product_ids)
+        return dict(zip(product_ids, frames))
+
+def compute_atr(high, low, close, period=14):
+    """Compute Wilder's ATR from high/low/close arrays (NaN for the first `period` bars)
+    
+    Results are memoized on a hash of the price arrays, so repeated runs over the
+    same window skip the recomputation.
+    """
+    high = np.ascontiguousarray(high)
+    low = np.ascontiguousarray(low)
+    close = np.ascontiguousarray(close)
+    
+    digest = hashlib.blake2b(digest_size=8)
+    for prices in (high, low, close):
+        digest.update(prices)
+    key = (digest.hexdigest(), close.dtype.str, period)
+    
+    atr = _atr_cache.get(key)
+    if atr is None:
+        if talib is not None:
+            # talib's C implementation only accepts float64 input; cast back so float32
+            # input gives float32 output on both branches, like atr_wilder
+            atr = talib.ATR(high.astype(np.float64), low.astype(np.float64), close.astype(np.float64),
+                            timeperiod=period)
+            if close.dtype == np.float32:
+                atr = atr.astype(np.float32)
+        else:
+            atr = atr_wilder(high, low, close, period=period)
+        _atr_cache[key] = atr
+        if len(_atr_cache) > ATR_CACHE_SIZE:
+            _atr_cache.popitem(last=False)
+    else:
+        _atr_cache.move_to_end(key)
+    
+    return atr.copy()
+
 def calculate_atr_percent(df, ta, product_id, period=14):
-    """Calculate ATR% for the dataset"""
+    """Calculate ATR% for the dataset
+    
+    ``ta`` is no longer used for the ATR itself; it is kept so existing callers don't break.
+    """
     if df.empty:
         logger.error("Cannot calculate ATR% for empty DataFrame")
         return df
     
-    # Convert DataFrame to list of dictionaries for the technical analysis methods
-    candles = df.to_dict('records')
+    # Work on the column buffers directly rather than through Series arithmetic
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    close = df['close'].to_numpy()
     
     # Calculate ATR
-    atr = ta.compute_atr(candles, period=period)
+    atr = compute_atr(high, low, close, period=period)
     
     # Calculate ATR% (ATR as percentage of price)
-    df['atr'] = atr
-    df['atr_percent'] = (df['atr'] / df['close']) * 100
+    df.loc[:, 'atr'] = atr
+    df.loc[:, 'atr_percent'] = atr / close * 100.0
     
     return df
 
@@ -92,11 +183,16 @@ def calculate_percentiles(df, percentiles=[70, 90]):
         logger.error("Cannot calculate percentiles: DataFrame is empty or missing ATR% column")
         return {}
     
-    results = {}
-    for p in percentiles:
-        results[f'percentile_{p}'] = np.percentile(df['atr_percent'], p)
+    # Skip the ATR warm-up bars, which are NaN
+    atr_percent = df['atr_percent'].dropna().to_numpy()
+    if atr_percent.size == 0:
+        logger.error("Cannot calculate percentiles: DataFrame is empty or missing ATR% column")
+        return {}
     
-    return results
+    # One np.quantile call sorts the data once for all requested percentiles
+    values = np.quantile(atr_percent, np.asarray(percentiles) / 100.0)
+    
+    return {f'percentile_{p}': v for p, v in zip(percentiles, values)}
 
 def check_atr_expansion(symbol: str = "BTC-USD", lookback: int = 5) -> Tuple[bool, float, float]:
     """
@@ -115,6 +211,26 @@ def check_atr_expansion(symbol: str = "BTC-USD", lookback: int = 5) -> Tuple[boo
     # Download hourly data
     df = yf.download(symbol, interval="1h", period="1mo")
     
+    return _atr_expansion(df, lookback)
+
+def check_atr_expansion_batch(symbols: List[str], lookback: int = 5) -> Dict[str, Tuple[bool, float, float]]:
+    """
+    Run check_atr_expansion for several symbols with a single yfinance download.
+    
+    Args:
+        symbols (List[str]): Trading pair symbols (e.g. ["BTC-USD", "ETH-USD"])
+        lookback (int): Number of periods to look back for comparison (default: 5)
+    
+    Returns:
+        Dict[str, Tuple[bool, float, float]]: check_atr_expansion result per symbol
+    """
+    # yfinance multiplexes a space-separated symbol list into one request
+    df = yf.download(" ".join(symbols), interval="1h", period="1mo", group_by="ticker")
+    
+    return {symbol: _atr_expansion(df[symbol].copy(), lookback) for symbol in symbols}
+
+def _atr_expansion(df, lookback):
+    """Compare the latest 14-period ATR with the value `lookback` periods ago"""
     # Calculate 14-period ATR
     df['ATR'] = df.ta.atr(length=14)
     
@@ -125,4 +241,4 @@ def check_atr_expansion(symbol: str = "BTC-USD", lookback: int = 5) -> Tuple[boo
     # Check if ATR is expanding
     is_expanding = current_atr > historical_atr
     
-    return is_expanding, current_atr, historical_atr
\ No newline at end of file
+    return is_expanding, current_atr, historical_atr
@@ -1,7 +1,7 @@
-import ccxt
+from exchanges import get_exchange
 import pandas as pd
 import numpy as np
-import talib
+from indicators import atr_wilder
 from datetime import datetime, timedelta
 import pytz
 
@@ -17,8 +17,8 @@ def get_atr_data(symbol='BTC/USD', timeframe='1h', limit=14):
     Returns:
         pd.DataFrame: DataFrame containing timestamp, close price, and ATR values
     """
-    # Initialize exchange (using Coinbase as default)
-    exchange = ccxt.coinbase()
+    # Reuse the shared exchange client (using Coinbase as default)
+    exchange = get_exchange()
     
     # Fetch OHLCV data
     ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
@@ -30,7 +30,7 @@ def get_atr_data(symbol='BTC/USD', timeframe='1h', limit=14):
     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
     
     # Calculate ATR14
-    df['atr14'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
+    df['atr14'] = atr_wilder(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), period=14)
     
     return df
 
@@ -1,5 +1,6 @@
 import pandas as pd
-from typing import Tuple
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Tuple
 from trend_detection import fetch_coinbase_data, calculate_atr
 
 def check_atr_expansion_coinbase(product_id: str = "BTC-USDC", lookback: int = 5) -> Tuple[bool, float, float]:
@@ -21,6 +22,39 @@ def check_atr_expansion_coinbase(product_id: str = "BTC-USDC", lookback: int = 5
     if df.empty or not all(col in df.columns for col in ['high', 'low', 'close']):
         raise ValueError("Failed to fetch data or missing columns from Coinbase.")
     
+    return _atr_expansion(df, lookback)
+
+def check_atr_expansion_coinbase_batch(product_ids: List[str], lookback: int = 5,
+                                       hours: int = 8000) -> Dict[str, Tuple[bool, float, float]]:
+    """
+    Run check_atr_expansion_coinbase for several products, fetching their candles concurrently.
+    
+    Args:
+        product_ids (List[str]): Trading pair symbols (e.g. ["BTC-USDC", "ETH-USDC"])
+        lookback (int): Number of periods to look back for comparison (default: 5)
+        hours (int): Number of 1-hour candles to fetch per product (default: 8000)
+    
+    Returns:
+        Dict[str, Tuple[bool, float, float]]: check_atr_expansion_coinbase result per product
+    """
+    # aiohttp is only needed here, so the single-product path works without it
+    from services.coinbase.asynccandles import fetch_candles_batch
+    
+    end = datetime.now(UTC)
+    candles = fetch_candles_batch(product_ids, end - timedelta(hours=hours), end, granularity="ONE_HOUR")
+    
+    results = {}
+    for product_id in product_ids:
+        if not candles[product_id]:
+            raise ValueError(f"Failed to fetch data from Coinbase for {product_id}.")
+        df = pd.DataFrame(candles[product_id])
+        df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].apply(
+            pd.to_numeric, errors='coerce')
+        results[product_id] = _atr_expansion(df, lookback)
+    return results
+
+def _atr_expansion(df: pd.DataFrame, lookback: int) -> Tuple[bool, float, float]:
+    """Compare the latest 14-period ATR with the value `lookback` periods ago"""
     # Calculate 14-period ATR
     df['ATR'] = calculate_atr(df['high'], df['low'], df['close'], period=14)
     
@@ -1,10 +1,76 @@
 import pandas as pd
 import numpy as np
 import talib
-import ccxt
-from datetime import datetime, timedelta
+from indicators import atr_wilder, atr_wilder_update
+from exchanges import get_exchange
+from datetime import datetime
 import pytz
 
+ATR_PERIOD = 14
+HISTORY_BARS = 150
+
+# Columns returned by check_btc_entry_conditions_last_n
+RESULT_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[ns]'),
+    ('rsi', 'f8'),
+    ('relative_volume', 'f8'),
+    ('atr', 'f8'),
+    ('atr_5_periods_ago', 'f8'),
+    ('rsi_condition', '?'),
+    ('volume_condition', '?'),
+    ('atr_condition', '?'),
+    ('all_met', '?'),
+])
+
+# Last fetched candles (with ATR) per (symbol, timeframe), so repeated calls only
+# fetch and smooth the bars that arrived since the previous call
+_candle_state = {}
+
+def _fetch_candles(exchange, symbol, timeframe, since):
+    """Fetch OHLCV candles from `since` (ms) as a DataFrame"""
+    ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=HISTORY_BARS)
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+    return df
+
+def _update_candles(exchange, symbol, timeframe, since):
+    """
+    Return the recent candles for symbol/timeframe with an up to date 'atr' column.
+
+    The first call fetches the full history from `since`; later calls refetch only from
+    the last stored bar (which may still have been forming) and continue the Wilder
+    recursion from the bar before it. If more bars have passed than one fetch returns,
+    the history is fetched afresh instead.
+    """
+    key = (symbol, timeframe)
+    df = _candle_state.get(key)
+    
+    if df is not None:
+        last_ts = int(df['timestamp'].iloc[-1].timestamp() * 1000)
+        # One fetch from last_ts returns HISTORY_BARS bars; past that it would stop short
+        # of the current bar
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        if exchange.milliseconds() - last_ts >= (HISTORY_BARS - 1) * timeframe_ms:
+            df = None
+    
+    if df is not None:
+        new = _fetch_candles(exchange, symbol, timeframe, last_ts)
+        if not new.empty:
+            keep = df[df['timestamp'] < new['timestamp'].iloc[0]]
+            if not keep.empty and not np.isnan(keep['atr'].iloc[-1]):
+                new['atr'] = atr_wilder_update(keep['atr'].iloc[-1], keep['close'].iloc[-1],
+                                               new['high'].values, new['low'].values, new['close'].values,
+                                               period=ATR_PERIOD)
+                df = pd.concat([keep, new], ignore_index=True).tail(HISTORY_BARS).reset_index(drop=True)
+                _candle_state[key] = df
+                return df.copy()
+    
+    # Cold start (or unusable state): fetch everything and run the full recursion
+    df = _fetch_candles(exchange, symbol, timeframe, since)
+    df['atr'] = atr_wilder(df['high'].values, df['low'].values, df['close'].values, period=ATR_PERIOD)
+    _candle_state[key] = df
+    return df.copy()
+
 def check_btc_entry_conditions_last_n(n: int = 10):
     """
     Check if BTC/USD meets specific entry conditions for the last n 1h candles.
@@ -19,8 +85,8 @@ def check_btc_entry_conditions_last_n(n: int = 10):
     Returns:
         pd.DataFrame: DataFrame with columns for each condition and overall result
     """
-    # Initialize exchange
-    exchange = ccxt.coinbase()
+    # Reuse the shared exchange client
+    exchange = get_exchange()
     
     # Get current time in UTC
     utc_now = datetime.now(pytz.UTC)
@@ -28,53 +94,42 @@ def check_btc_entry_conditions_last_n(n: int = 10):
     # Get BTC/USD OHLCV data for the last 100 hours (to ensure enough data for calculations)
     timeframe = '1h'
     # Get data from 5 days ago to ensure we have enough data for calculations
-    since = exchange.parse8601((utc_now - timedelta(days=5)).isoformat())
+    since = exchange.milliseconds() - 5 * 86400_000
     
     # Fetch more data than needed to ensure we have the most recent
-    ohlcv = exchange.fetch_ohlcv('BTC/USD', timeframe, since=since, limit=150)
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+    df = _update_candles(exchange, 'BTC/USD', timeframe, since)
     
     # Print the first and last timestamps to verify data range
     print(f"Data range: from {df['timestamp'].iloc[0]} to {df['timestamp'].iloc[-1]}")
     print(f"Current time (UTC): {utc_now}")
     print(f"Time difference: {utc_now - df['timestamp'].iloc[-1]}")
     
-    # Calculate indicators
-    df['rsi'] = talib.RSI(df['close'].values, timeperiod=14)
-    df['volume_ma'] = talib.SMA(df['volume'].values, timeperiod=14)
-    df['relative_volume'] = df['volume'] / df['volume_ma']
-    df['atr'] = talib.ATR(df['high'].values, df['low'].values, df['close'].values, timeperiod=14)
+    # Calculate indicators on the column buffers
+    close = df['close'].to_numpy()
+    volume = df['volume'].to_numpy()
+    atr = df['atr'].to_numpy()
+    rsi = talib.RSI(close, timeperiod=14)
+    relative_volume = volume / talib.SMA(volume, timeperiod=14)
+    atr_5_periods_ago = np.concatenate([np.full(min(5, len(atr)), np.nan), atr[:-5]])
+    
+    # Fill the result for the last n candles column by column
+    first = max(len(df) - n, 0)
+    tail = slice(first, None)
+    out = np.empty(len(df) - first, dtype=RESULT_DTYPE)
+    out['timestamp'] = df['timestamp'].iloc[tail].dt.tz_convert(None).to_numpy()
+    out['rsi'] = rsi[tail]
+    out['relative_volume'] = relative_volume[tail]
+    out['atr'] = atr[tail]
+    out['atr_5_periods_ago'] = atr_5_periods_ago[tail]
+    out['rsi_condition'] = out['rsi'] < 30
+    out['volume_condition'] = out['relative_volume'] > 1.5
+    # Comparisons against NaN are False, so missing history fails the ATR condition
+    out['atr_condition'] = out['atr'] > out['atr_5_periods_ago']
+    out['all_met'] = out['rsi_condition'] & out['volume_condition'] & out['atr_condition']
     
-    # Prepare results for the last n candles
-    results = []
-    for i in range(-n, 0):
-        latest_rsi = df['rsi'].iloc[i]
-        latest_relative_volume = df['relative_volume'].iloc[i]
-        latest_atr = df['atr'].iloc[i]
-        # For ATR 5 periods ago, make sure we don't go out of bounds
-        if i - 5 < -len(df):
-            atr_5_periods_ago = np.nan
-        else:
-            atr_5_periods_ago = df['atr'].iloc[i-5]
-        rsi_condition = latest_rsi < 30
-        volume_condition = latest_relative_volume > 1.5
-        atr_condition = latest_atr > atr_5_periods_ago if not np.isnan(atr_5_periods_ago) else False
-        all_met = all([rsi_condition, volume_condition, atr_condition])
-        results.append({
-            'timestamp': df['timestamp'].iloc[i],
-            'rsi': latest_rsi,
-            'relative_volume': latest_relative_volume,
-            'atr': latest_atr,
-            'atr_5_periods_ago': atr_5_periods_ago,
-            'rsi_condition': rsi_condition,
-            'volume_condition': volume_condition,
-            'atr_condition': atr_condition,
-            'all_met': all_met
-        })
-    return pd.DataFrame(results)
+    results = pd.DataFrame.from_records(out)
+    results['timestamp'] = results['timestamp'].dt.tz_localize('UTC')
+    return results
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+"""
+Shared ccxt exchange clients for the analysis scripts.
+"""
+
+import ccxt
+import requests
+from requests.adapters import HTTPAdapter
+from functools import lru_cache
+
+@lru_cache(maxsize=4)
+def get_exchange(name: str = 'coinbase'):
+    """
+    Return a process-wide ccxt exchange client.
+    
+    Constructing a client loads market metadata and opens fresh connections, so it is
+    shared across calls and uses a pooled keep-alive session.
+    """
+    exchange = getattr(ccxt, name)({'enableRateLimit': True})
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    exchange.session = session
+    return exchange
@@ -0,0 +1,287 @@
+"""
+Numerical kernels for technical indicators shared by the analysis scripts.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, types
+except ImportError:  # numba is optional - the kernels then run as plain Python loops
+    types = None
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+def _signatures(build):
+    """
+    Eager numba signatures for a kernel, one per price dtype and input writability.
+
+    Compiling when the kernel is defined (and, with cache=True, loading it from disk on
+    later runs) keeps the JIT out of the first call. `build(arr, out)` returns the
+    signature given the input and output array types. _price_array only ever hands the
+    kernels contiguous float32 or float64 arrays, and pandas' to_numpy() views may be
+    read-only.
+    """
+    if types is None:
+        return []
+    signatures = []
+    for dtype in (types.float32, types.float64):
+        out = types.Array(dtype, 1, 'A')
+        for readonly in (False, True):
+            signatures.append(build(types.Array(dtype, 1, 'C', readonly=readonly), out))
+    return signatures
+
+def _price_array(values):
+    """Contiguous float32/float64 array of `values`; other dtypes are cast to float64"""
+    arr = np.ascontiguousarray(values)
+    if arr.dtype != np.float32 and arr.dtype != np.float64:
+        arr = arr.astype(np.float64)
+    return arr
+
+def true_range(high, low, close, prev_close=None):
+    """
+    Calculate the true range of each bar without branches.
+
+    Args:
+        high, low, close: Price arrays of equal length
+        prev_close (float, optional): Close of the bar before the first one. Without it
+            the first bar has no previous close and its true range is high - low.
+
+    Returns:
+        np.ndarray: True range values
+    """
+    high = _price_array(high)
+    low = _price_array(low)
+    close = _price_array(close)
+    if close.shape[0] == 0:
+        return np.empty(0, dtype=np.result_type(high, low, close))
+
+    shifted = np.empty_like(close)
+    shifted[0] = close[0] if prev_close is None else prev_close
+    shifted[1:] = close[:-1]
+    # np.maximum.reduce on the stacked candidates compiles to SIMD max instructions
+    return np.maximum.reduce([high - low, np.abs(high - shifted), np.abs(low - shifted)])
+
+@njit(_signatures(lambda arr, out: out(arr, types.int64, out)), cache=True)
+def _atr_wilder(tr, period, out):
+    """Wilder smoothing of true ranges, seeded with the SMA of tr[1:period + 1]"""
+    # The running state is a float64 scalar even for float32 inputs; only the
+    # array traffic is narrowed
+    n = tr.shape[0]
+    out[:] = np.nan
+    if n <= period:
+        return out
+
+    total = 0.0
+    for i in range(1, period + 1):
+        total += tr[i]
+    atr = total / period
+    out[period] = atr
+
+    for i in range(period + 1, n):
+        atr += (tr[i] - atr) / period
+        out[i] = atr
+    return out
+
+@njit(_signatures(lambda arr, out: out(types.float64, arr, types.int64, out)), cache=True)
+def _atr_wilder_update(prev_atr, tr, period, out):
+    """Continue the Wilder smoothing from a known ATR value"""
+    atr = prev_atr
+    for i in range(tr.shape[0]):
+        atr += (tr[i] - atr) / period
+        out[i] = atr
+    return out
+
+def atr_wilder(high, low, close, period=14, out=None):
+    """
+    Calculate Wilder's Average True Range.
+
+    Matches talib.ATR: the first `period` values are NaN.
+
+    Args:
+        high, low, close: Price arrays of equal length
+        period (int): ATR period (default: 14)
+        out (np.ndarray, optional): Preallocated output buffer to reuse across calls
+
+    Returns:
+        np.ndarray: ATR values, float32 for float32 input and float64 otherwise
+    """
+    tr = true_range(high, low, close)
+    if out is None:
+        out = np.empty(tr.shape[0], dtype=tr.dtype)
+    return _atr_wilder(tr, period, out)
+
+def atr_wilder_update(prev_atr, prev_close, high, low, close, period=14, out=None):
+    """
+    Extend a Wilder ATR series with new bars without recomputing the history.
+
+    Args:
+        prev_atr (float): ATR of the bar preceding the new ones
+        prev_close (float): Close of the bar preceding the new ones
+        high, low, close: Price arrays of the new bars
+        period (int): ATR period (default: 14)
+        out (np.ndarray, optional): Preallocated output buffer
+
+    Returns:
+        np.ndarray: ATR values for the new bars
+    """
+    tr = true_range(high, low, close, prev_close=prev_close)
+    if out is None:
+        out = np.empty(tr.shape[0], dtype=tr.dtype)
+    return _atr_wilder_update(float(prev_atr), tr, period, out)
+
+@njit(_signatures(lambda arr, out: out(arr, types.float64, out)), cache=True)
+def _ema(values, alpha, out):
+    """EMA recurrence seeded with the first value (pandas ewm(adjust=False))"""
+    n = values.shape[0]
+    if n == 0:
+        return out
+    ema = float(values[0])
+    out[0] = ema
+    for i in range(1, n):
+        ema = alpha * values[i] + (1.0 - alpha) * ema
+        out[i] = ema
+    return out
+
+def ema(values, span, out=None):
+    """
+    Calculate an exponential moving average.
+
+    Matches pandas' ewm(span=span, adjust=False).mean() on NaN-free input.
+
+    Args:
+        values: Price array
+        span (int): EMA span; the smoothing factor is 2 / (span + 1)
+        out (np.ndarray, optional): Preallocated output buffer
+
+    Returns:
+        np.ndarray: EMA values
+    """
+    values = _price_array(values)
+    if out is None:
+        out = np.empty(values.shape[0], dtype=values.dtype)
+    return _ema(values, 2.0 / (span + 1), out)
+
+@njit(_signatures(lambda arr, out: out(arr, types.int64, out)), cache=True)
+def _rolling_mean(values, window, out):
+    """Mean of each trailing window; NaN until the window is full or if it holds a NaN"""
+    n = values.shape[0]
+    for i in range(min(window - 1, n)):
+        out[i] = np.nan
+    for i in range(window - 1, n):
+        # Summing each window afresh keeps the result exact (no running-sum drift) and
+        # costs little for indicator-sized windows
+        total = 0.0
+        for j in range(i - window + 1, i + 1):
+            total += values[j]
+        out[i] = total / window
+    return out
+
+def rolling_mean(values, window, out=None):
+    """
+    Calculate a simple moving average.
+
+    Matches pandas' rolling(window).mean(): the first `window - 1` values are NaN.
+
+    Args:
+        values: Input array
+        window (int): Window length
+        out (np.ndarray, optional): Preallocated output buffer
+
+    Returns:
+        np.ndarray: Moving average values
+    """
+    values = _price_array(values)
+    if out is None:
+        out = np.empty(values.shape[0], dtype=values.dtype)
+    return _rolling_mean(values, window, out)
+
+@njit(_signatures(lambda arr, out: types.UniTuple(out, 2)(arr, types.int64, out, out)), cache=True)
+def _rolling_mean_std(values, window, mean_out, std_out):
+    """Mean and sample standard deviation of each trailing window"""
+    n = values.shape[0]
+    for i in range(min(window - 1, n)):
+        mean_out[i] = np.nan
+        std_out[i] = np.nan
+    for i in range(window - 1, n):
+        total = 0.0
+        for j in range(i - window + 1, i + 1):
+            total += values[j]
+        mean = total / window
+        # Squared deviations from the window mean rather than a running sum of squares,
+        # which loses most of its digits to cancellation at BTC-sized prices
+        sq = 0.0
+        for j in range(i - window + 1, i + 1):
+            sq += (values[j] - mean) ** 2
+        mean_out[i] = mean
+        std_out[i] = np.sqrt(sq / (window - 1))
+    return mean_out, std_out
+
+def rolling_mean_std(values, window):
+    """
+    Calculate a simple moving average and moving standard deviation in one pass.
+
+    Matches pandas' rolling(window).mean() and rolling(window).std() (ddof=1): the first
+    `window - 1` values are NaN.
+
+    Args:
+        values: Input array
+        window (int): Window length (at least 2)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (mean, std)
+    """
+    values = _price_array(values)
+    mean = np.empty(values.shape[0], dtype=values.dtype)
+    std = np.empty(values.shape[0], dtype=values.dtype)
+    return _rolling_mean_std(values, window, mean, std)
+
+@njit(_signatures(lambda arr, out: out(arr, types.int64, out)), cache=True)
+def _rsi_wilder(close, period, out):
+    """Wilder-smoothed RSI, seeded with the mean gain/loss of the first `period` changes"""
+    n = close.shape[0]
+    out[:] = np.nan
+    if n <= period:
+        return out
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        delta = close[i] - close[i - 1]
+        if delta > 0:
+            avg_gain += delta
+        else:
+            avg_loss -= delta
+    avg_gain /= period
+    avg_loss /= period
+
+    for i in range(period, n):
+        if i > period:
+            delta = close[i] - close[i - 1]
+            avg_gain = (avg_gain * (period - 1) + max(delta, 0.0)) / period
+            avg_loss = (avg_loss * (period - 1) + max(-delta, 0.0)) / period
+        total = avg_gain + avg_loss
+        out[i] = 100.0 * avg_gain / total if total != 0 else 0.0
+    return out
+
+def rsi_wilder(close, period=14, out=None):
+    """
+    Calculate Wilder's Relative Strength Index.
+
+    Matches talib.RSI: the first `period` values are NaN, and a flat stretch (no gains or
+    losses) gives 0.
+
+    Args:
+        close: Close prices
+        period (int): RSI period (default: 14)
+        out (np.ndarray, optional): Preallocated output buffer
+
+    Returns:
+        np.ndarray: RSI values
+    """
+    close = _price_array(close)
+    if out is None:
+        out = np.empty(close.shape[0], dtype=close.dtype)
+    return _rsi_wilder(close, period, out)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import aiohttp
+
+PUBLIC_CANDLES_URL = "https://api.coinbase.com/api/v3/brokerage/market/products/{product_id}/candles"
+MAX_CANDLES_PER_REQUEST = 350
+MAX_CONNECTIONS = 16
+MAX_RETRIES = 3
+
+GRANULARITY_SECONDS = {
+    "ONE_MINUTE": 60,
+    "FIVE_MINUTE": 300,
+    "FIFTEEN_MINUTE": 900,
+    "THIRTY_MINUTE": 1800,
+    "ONE_HOUR": 3600,
+    "TWO_HOUR": 7200,
+    "SIX_HOUR": 21600,
+    "ONE_DAY": 86400,
+}
+
+logger = logging.getLogger(__name__)
+
+async def _fetch_chunk(session: aiohttp.ClientSession, product_id: str, start: int, end: int,
+                       granularity: str) -> List[dict]:
+    """Fetch a single request's worth of candles, retrying with exponential backoff."""
+    url = PUBLIC_CANDLES_URL.format(product_id=product_id)
+    params = {"start": str(start), "end": str(end), "granularity": granularity}
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status == 429 and attempt < MAX_RETRIES:
+                    # Rate limited - wait as long as the API asks before retrying
+                    retry_after = response.headers.get("Retry-After", "")
+                    await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                payload = await response.json()
+                return payload.get("candles", [])
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error fetching {product_id} candles from {start} to {end} "
+                         f"(attempt {attempt}/{MAX_RETRIES}): {e}")
+            if attempt < MAX_RETRIES:
+                await asyncio.sleep(2 ** attempt)
+
+    logger.error(f"Failed to fetch {product_id} candles from {start} to {end} after {MAX_RETRIES} attempts")
+    return []
+
+async def fetch_candles_async(session: aiohttp.ClientSession, product_id: str, start: datetime,
+                              end: datetime, granularity: str = "ONE_HOUR") -> List[dict]:
+    """
+    Fetch public candles for a product, requesting all chunks of the range concurrently.
+
+    Args:
+        session: Shared aiohttp session
+        product_id: Trading pair (e.g., 'BTC-USDC')
+        start: Start of the range
+        end: End of the range
+        granularity: Candle granularity (default: 'ONE_HOUR')
+
+    Returns:
+        List of candle dicts ('start', 'low', 'high', 'open', 'close', 'volume'), oldest first
+    """
+    step = GRANULARITY_SECONDS[granularity] * MAX_CANDLES_PER_REQUEST
+    start_ts = int(start.timestamp())
+    end_ts = int(end.timestamp())
+
+    chunks = await asyncio.gather(*(
+        _fetch_chunk(session, product_id, chunk_start, min(chunk_start + step, end_ts), granularity)
+        for chunk_start in range(start_ts, end_ts, step)
+    ))
+
+    # Adjacent chunks share their boundary candle
+    candles = {candle["start"]: candle for chunk in chunks for candle in chunk}
+    return [candles[key] for key in sorted(candles, key=int)]
+
+async def fetch_candles_batch_async(product_ids: Sequence[str], start: datetime, end: datetime,
+                                    granularity: str = "ONE_HOUR") -> Dict[str, List[dict]]:
+    """Fetch candles for several products over one pooled session, keyed by product ID."""
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        results = await asyncio.gather(*(
+            fetch_candles_async(session, product_id, start, end, granularity)
+            for product_id in product_ids
+        ))
+    return dict(zip(product_ids, results))
+
+def fetch_candles_batch(product_ids: Sequence[str], start: datetime, end: datetime,
+                        granularity: str = "ONE_HOUR") -> Dict[str, List[dict]]:
+    """
+    Blocking wrapper around fetch_candles_batch_async for synchronous callers.
+
+    It runs its own event loop, so it cannot be called while one is already running
+    (e.g. in Jupyter or from a coroutine); await fetch_candles_batch_async there instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_candles_batch_async(product_ids, start, end, granularity))
+    raise RuntimeError("fetch_candles_batch() cannot run inside a running event loop; "
+                       "await fetch_candles_batch_async() instead")
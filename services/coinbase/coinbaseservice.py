@@ -1,27 +1,304 @@
 from coinbase.rest import RESTClient
 from coinbase.rest import portfolios, products, orders
-from datetime import datetime, timedelta
+from coinbase.websocket import WSUserClient
+from datetime import datetime, timedelta, timezone
 import time
+import json
+import threading
 import uuid
+import itertools
+import random
 import logging
-from typing import Tuple, List
-from .historicaldata import HistoricalData
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from concurrent.futures import wait
-import ccxt
-import pandas as pd
+import asyncio
+import socket
+from functools import lru_cache, cached_property
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from typing import Tuple, List, Dict
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, is_dataclass
 import numpy as np
 
+MIN_TRADE_BALANCE = 5
+CANCEL_BATCH_SIZE = 100  # max order IDs per batch_cancel request
+TERMINAL_ORDER_STATUSES = frozenset(("FILLED", "CANCELLED", "EXPIRED", "FAILED"))
+CLOSE_ATTEMPTS = 4  # create_order attempts per position in close_all_positions
+CLOSE_RETRY_BACKOFF_SECONDS = 0.1  # base delay before a reduced-size close attempt
+
+# TCP keepalive probes so idle pooled connections to the API aren't silently dropped
+_KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 15))
+    if hasattr(socket, name)  # Linux-only options
+]
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; each body is still decoded only once
+    _json_loads = json.loads
+
+def _decode_json_once(response, *args, **kwargs):
+    """
+    requests response hook: memoize response.json() and decode with orjson when available.
+    
+    The SDK calls response.json() twice per request (once just for a debug log line).
+    """
+    decoded = []
+    def json_once(**kwargs):
+        if not decoded:
+            decoded.append(_json_loads(response.content))
+        return decoded[0]
+    response.json = json_once
+    return response
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections enable TCP keepalive."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = _KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+class _CachedJWTRESTClient(RESTClient):
+    """
+    RESTClient that reuses the signed JWT for each endpoint until shortly before it expires.
+    
+    The SDK signs a fresh token (valid for 120 s, scoped to the method and path) for every
+    request; bursts such as closing every position hit the same few endpoints.
+    """
+    JWT_REUSE_SECONDS = 120 - 15  # margin for clock skew and request latency
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._jwt_lock = threading.Lock()
+        self._jwt_headers = {}  # (method, path) -> (headers, expires_at)
+
+    def set_headers(self, method, path):
+        key = (method, path)
+        now = time.monotonic()
+        with self._jwt_lock:
+            cached = self._jwt_headers.get(key)
+            if cached is not None and now < cached[1]:
+                return dict(cached[0])
+        headers = super().set_headers(method, path)
+        if "Authorization" in headers:
+            with self._jwt_lock:
+                self._jwt_headers[key] = (headers, now + self.JWT_REUSE_SECONDS)
+        return dict(headers)
+
+@dataclass(slots=True)
+class OrderRequest:
+    """Parameters of a create_order call."""
+    client_order_id: str
+    product_id: str
+    side: str
+    order_configuration: dict
+
+    def as_kwargs(self) -> dict:
+        """Keyword arguments for RESTClient.create_order (shallow, unlike dataclasses.asdict)"""
+        return {
+            "client_order_id": self.client_order_id,
+            "product_id": self.product_id,
+            "side": self.side,
+            "order_configuration": self.order_configuration,
+        }
+
+def _extract(obj, *path):
+    """Follow `path` through nested dicts and SDK response objects, returning None if any step is missing."""
+    for key in path:
+        obj = obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+        if obj is None:
+            return None
+    return obj
+
+def _same_dict(obj) -> dict:
+    return obj
+
+def _attribute_dict(obj) -> dict:
+    return getattr(obj, '__dict__', None) or {}
+
+@lru_cache(maxsize=64)
+def _dict_converter(cls):
+    """How to turn instances of `cls` into a dict, chosen once per type."""
+    if issubclass(cls, dict):
+        return _same_dict
+    if hasattr(cls, 'model_dump'):  # pydantic models
+        return cls.model_dump
+    if is_dataclass(cls):
+        return asdict
+    # The SDK's BaseResponse types keep their fields as plain attributes. Their attribute
+    # dict is returned as is, which is cheaper than copying it with the recursive to_dict()
+    return _attribute_dict
+
+def _as_dict(obj) -> dict:
+    """Fields of an SDK response object as a dict (a dict is returned as is, None as {})."""
+    return _dict_converter(type(obj))(obj)
+
+def _error_response(response):
+    """The error_response of an SDK response object or dict, or None if it has none."""
+    try:
+        return response.error_response
+    except AttributeError:
+        return response.get('error_response') if isinstance(response, dict) else None
+
+def _is_perpetual(product_id: str) -> bool:
+    """True for perpetual futures product IDs such as 'BTC-PERP-INTX'."""
+    return "-PERP-" in product_id
+
+def _ws_is_open(ws_client) -> bool:
+    """True if an SDK WebSocket client currently has an open connection."""
+    return bool(ws_client.websocket is not None and ws_client.websocket.open)
+
+def _trade_amount_and_fee(balance: float, price: float, fee_rate: float, is_buy: bool) -> Tuple[float, float]:
+    """Trade amount and fee for spending (buy) or selling (sell) `balance` at `price`."""
+    if is_buy:
+        trade_amount = (balance / price) / (1 + fee_rate)
+        return trade_amount, balance - (trade_amount * price)
+    fee = balance * fee_rate
+    return balance - fee, fee
+
+def trade_amounts_and_fees(balances, prices, fee_rate: float, is_buy: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized CoinbaseService.calculate_trade_amount_and_fee for backtests.
+    
+    Args:
+        balances: Available balance per trade (array-like or scalar)
+        prices: Asset price per trade (array-like or scalar)
+        fee_rate (float): Fee rate, e.g. from CoinbaseService._get_fee_rate()
+        is_buy (bool): True for buy orders, False for sell orders
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (trade_amounts, fees); zero where the balance is too low
+    """
+    balances, prices = np.broadcast_arrays(np.asarray(balances, dtype=np.float64),
+                                           np.asarray(prices, dtype=np.float64))
+    trade_amounts, fees = _trade_amount_and_fee(balances, prices, fee_rate, is_buy)
+    too_low = balances < MIN_TRADE_BALANCE
+    return np.where(too_low, 0.0, trade_amounts), np.where(too_low, 0.0, fees)
+
 class CoinbaseService:
+    # Spot order_configuration templates: (side, order_type[, time_in_force]) ->
+    # (configuration key, size field, constant fields). Buys are sized in quote currency
+    _SPOT_ORDER_TEMPLATES = {
+        ("BUY", "MARKET"): ("market_market_ioc", "quote_size", {}),
+        ("SELL", "MARKET"): ("market_market_ioc", "base_size", {}),
+        ("BUY", "LIMIT", "GTC"): ("limit_limit_gtc", "quote_size", {"post_only": False}),
+        ("SELL", "LIMIT", "GTC"): ("limit_limit_gtc", "base_size", {"post_only": False}),
+        ("BUY", "LIMIT", "IOC"): ("sor_limit_ioc", "quote_size", {}),
+        ("SELL", "LIMIT", "IOC"): ("sor_limit_ioc", "base_size", {}),
+        ("BUY", "LIMIT", "FOK"): ("limit_limit_fok", "quote_size", {}),
+        ("SELL", "LIMIT", "FOK"): ("limit_limit_fok", "base_size", {}),
+    }
+
     def __init__(self, api_key, api_secret):
-        self.client = RESTClient(api_key=api_key, api_secret=api_secret)
+        # Rate-limit headers let HistoricalData back off only when the quota runs low
+        self.client = _CachedJWTRESTClient(api_key=api_key, api_secret=api_secret, rate_limit_headers=True)
+        # Reuse TLS connections across calls and retry transient gateway errors. Retry
+        # leaves POST (order creation) alone by default, so orders are never resubmitted.
+        # raise_on_status=False hands the last 5xx back to the SDK, which raises its usual
+        # HTTPError rather than urllib3's RetryError
+        self.client.session.mount("https://", _KeepAliveAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504],
+                              raise_on_status=False),
+        ))
+        self.client.session.hooks["response"].append(_decode_json_once)
         self.DEFAULT_FEE_RATE = 0.005  # 0.5%
         self.MAX_RETRIES = 1
         self.RETRY_DELAY_SECONDS = 60
         self.BRACKET_ORDER_TAKE_PROFIT_MULTIPLIER = 1.02
         self.BRACKET_ORDER_STOP_LOSS_MULTIPLIER = 0.98
-        self.historical_data = HistoricalData(self.client)  # Initialize HistoricalData
+        self.FILL_POLL_ATTEMPTS = 10
+        self.FILL_POLL_INTERVAL_SECONDS = 0.2
+        self.FILL_EVENT_TIMEOUT_SECONDS = 2.0
+        self.MAX_TRACKED_ORDERS = 1000
+        self.MONITOR_SAFETY_POLL_SECONDS = 60  # REST re-check interval while the user stream is connected
+        self.WS_OPEN_TIMEOUT_SECONDS = 5
+        self.WS_RETRY_BACKOFF_SECONDS = 30  # wait after a failed connect before trying again
         self.logger = logging.getLogger(__name__)
+        self._portfolio_uuid_cache = {}  # portfolio type -> (uuid, fetched_at)
+        self._portfolio_cache_ttl = 60  # seconds
+        self._fee_rate_cache = (None, 0.0)  # (rate, expires_at)
+        self._fee_rate_cache_ttl = 3600  # fee tiers change over days, not trades
+        # Random per-instance prefix plus a counter keeps client order IDs unique
+        # without drawing fresh entropy for every order
+        self._coid_prefix = uuid.uuid4().hex[:8]
+        self._coid_counter = itertools.count()
+        self._gtd_end_cache = ("", 0.0)  # (end_time, computed_at)
+        self._trading_pairs_cache = ([], 0.0)  # (pairs, fetched_at)
+        self._trading_pairs_cache_ttl = 60  # seconds
+        # place_order routes on _is_perpetual(product_id)
+        self._order_dispatch = {True: self._place_order_perp, False: self._place_order_spot}
+        # Terminal order updates (fills, cancels, ...) from the user WebSocket channel,
+        # started on first use
+        self._ws_user = None
+        self._ws_lock = threading.Lock()
+        self._ws_retry_at = 0.0  # time.monotonic() before which no reconnect is attempted
+        self._order_events_lock = threading.Lock()
+        self._order_events = OrderedDict()  # order_id -> threading.Event
+        self._order_updates = {}  # order_id -> order payload from the terminal update
+        # Running monitor_limit_order_and_place_bracket loops, each with its own events so
+        # cancel_monitor() only reaches the monitors running when it is called:
+        # wake Event -> (order_id, stop Event)
+        self._monitors = {}
+
+    def _new_client_order_id(self, tag: str) -> str:
+        """Return a unique client_order_id such as 'market_1a2b3c4d0000002a'."""
+        return f"{tag}_{self._coid_prefix}{next(self._coid_counter):08x}"
+
+    def _gtd_end_time(self) -> str:
+        """End time 30 days out for GTD orders; reused for a minute since the exact second is irrelevant."""
+        end_time, computed_at = self._gtd_end_cache
+        now = time.time()
+        if now - computed_at >= 60:
+            end_time = (datetime.now(timezone.utc) + timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            self._gtd_end_cache = (end_time, now)
+        return end_time
+
+    def close(self):
+        """Close the user WebSocket and the pooled HTTP connections"""
+        with self._ws_lock:
+            if self._ws_user is not None:
+                self._close_user_stream(self._ws_user)
+                self._ws_user = None
+        self.client.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @cached_property
+    def historical_data(self):
+        """HistoricalData helper, created (and its module imported) on first use"""
+        from .historicaldata import HistoricalData
+        return HistoricalData(self.client)
+
+    def _get_portfolio_uuid(self, portfolio_type):
+        """
+        Return the UUID of the first portfolio of the given type, or None if there is none.
+        
+        The type -> UUID map is cached for _portfolio_cache_ttl seconds, so steady-state
+        callers skip the get_portfolios round-trip.
+        """
+        now = time.time()
+        cached = self._portfolio_uuid_cache.get(portfolio_type)
+        if cached and now - cached[1] < self._portfolio_cache_ttl:
+            return cached[0]
+        
+        ports = portfolios.get_portfolios(self.client)["portfolios"]
+        # Log available portfolio types for debugging
+        self.logger.debug(f"Available portfolio types: {[p['type'] for p in ports]}")
+        # Reversed so the first portfolio of each type wins
+        self._portfolio_uuid_cache = {p["type"]: (p["uuid"], now) for p in reversed(ports)}
+        
+        cached = self._portfolio_uuid_cache.get(portfolio_type)
+        return cached[0] if cached else None
 
     def get_portfolio_info(self, portfolio_type="DEFAULT"):
         """
@@ -35,43 +312,40 @@ class CoinbaseService:
                                 or (usd_balance, perp_position_size) for perpetuals
         """
         try:
-            ports = portfolios.get_portfolios(self.client)["portfolios"]
-            # Log available portfolio types for debugging
-            available_types = [p["type"] for p in ports]
-            self.logger.debug(f"Available portfolio types: {available_types}")
-            
-            for p in ports:
-                if p["type"] == portfolio_type:
-                    uuid = p["uuid"]
-                    breakdown = portfolios.get_portfolio_breakdown(self.client, portfolio_uuid=uuid)
-                    if portfolio_type == "DEFAULT":
-                        spot = breakdown["breakdown"]["spot_positions"]
-                        
-                        # Initialize balances
-                        fiat_balance = 0.0
-                        crypto_balance = 0.0
-                        
-                        for position in spot:
-                            if position["asset"] == "BTC":
-                                fiat_balance = float(position["total_balance_fiat"])
-                                crypto_balance = float(position["total_balance_crypto"])
-                                break
-                        
-                        self.logger.info(f"Retrieved {portfolio_type} portfolio - "
-                                       f"Fiat: {fiat_balance}, Crypto: {crypto_balance}")
-                        return fiat_balance, crypto_balance
-                    
-                    elif portfolio_type == "INTX":
-                        perps = breakdown["breakdown"]["portfolio_balances"]
-                        
-                        # Initialize perpetual values
-                        usd_balance = float(perps["total_balance"]["value"])
-                        perp_position_size = 0.0
-                        
-                        
-                        self.logger.info(f"Retrieved {portfolio_type} portfolio - "
-                                       f"USD Balance: {usd_balance}, Position Size: {perp_position_size}")
-                        return usd_balance, perp_position_size
+            uuid = self._get_portfolio_uuid(portfolio_type)
+            if uuid is None:
+                self.logger.warning(f"Portfolio type {portfolio_type} not found")
+                return 0.0, 0.0
+            
+            breakdown = portfolios.get_portfolio_breakdown(self.client, portfolio_uuid=uuid)
+            if portfolio_type == "DEFAULT":
+                spot = breakdown["breakdown"]["spot_positions"]
+                
+                # Initialize balances
+                fiat_balance = 0.0
+                crypto_balance = 0.0
+                
+                for position in spot:
+                    if position["asset"] == "BTC":
+                        fiat_balance = float(position["total_balance_fiat"])
+                        crypto_balance = float(position["total_balance_crypto"])
+                        break
+                
+                self.logger.info(f"Retrieved {portfolio_type} portfolio - "
+                               f"Fiat: {fiat_balance}, Crypto: {crypto_balance}")
+                return fiat_balance, crypto_balance
+            
+            elif portfolio_type == "INTX":
+                perps = breakdown["breakdown"]["portfolio_balances"]
+                
+                # Initialize perpetual values
+                usd_balance = float(perps["total_balance"]["value"])
+                perp_position_size = 0.0
+                
+                
+                self.logger.info(f"Retrieved {portfolio_type} portfolio - "
+                               f"USD Balance: {usd_balance}, Position Size: {perp_position_size}")
+                return usd_balance, perp_position_size
             
             self.logger.warning(f"Portfolio type {portfolio_type} not found")
             return 0.0, 0.0
@@ -81,15 +355,15 @@ class CoinbaseService:
             return 0.0, 0.0
 
     def get_btc_prices(self):
-        prices = {}
-    
-        for p in products.get_best_bid_ask(self.client)["pricebooks"]:
-            if p["product_id"] in ["BTC-EUR", "BTC-USDC"]:
-                prices[p["product_id"]] = {
-                    "bid": float(p["bids"][0]["price"]),
-                    "ask": float(p["asks"][0]["price"])
-                }
-        return prices
+        # Let the API filter the pricebooks rather than downloading every product's
+        pricebooks = products.get_best_bid_ask(self.client, product_ids=["BTC-EUR", "BTC-USDC"])["pricebooks"]
+        return {
+            p["product_id"]: {
+                "bid": float(p["bids"][0]["price"]),
+                "ask": float(p["asks"][0]["price"])
+            }
+            for p in pricebooks
+        }
 
     def place_order(self, product_id: str, side: str, size: float, order_type: str = "MARKET", price: float = None, time_in_force: str = "IOC"):
         """
@@ -104,68 +378,62 @@ class CoinbaseService:
             time_in_force (str): Time in force policy (default "IOC")
         """
         try:
-            # Generate a unique client_order_id
-            client_order_id = f"order_{uuid.uuid4().hex[:16]}_{int(time.time())}"
-            
-            # Check if this is a perpetual product
-            is_perpetual = "-PERP-" in product_id
-            
-            if is_perpetual:
-                # For perpetual futures, use create_market_order_perp
-                if order_type.upper() == "MARKET":
-                    order_config = {
-                        "market_market_ioc": {
-                            "base_size": str(size)
-                        }
-                    }
-                    
-                    self.logger.info(f"Placing perpetual {side} market order for {size} {product_id}")
-                    market_order = self.client.create_order(
-                        client_order_id=client_order_id,
-                        product_id=product_id,
-                        side=side.upper(),
-                        order_configuration=order_config
-                    )
-                    self.logger.info(f"Perpetual market order response: {market_order}")
-                    return market_order
-                    
-                else:
-                    raise ValueError("Only MARKET orders supported for perpetual futures currently")
-            else:
-                # Original order logic for spot trading
-                order_params = {
-                    "client_order_id": client_order_id,
-                    "product_id": product_id,
-                    "side": side.upper(),
-                    "order_configuration": {
-                        order_type.lower(): {
-                            "quote_size" if side.upper() == "BUY" else "base_size": str(size)
-                        }
-                    }
-                }
-
-                if order_type.upper() == "LIMIT":
-                    if price is None:
-                        raise ValueError("Price must be specified for LIMIT orders")
-                    order_params["order_configuration"]["limit"]["limit_price"] = str(price)
-                    order_params["order_configuration"]["limit"]["post_only"] = False
-                    order_params["order_configuration"]["limit"]["time_in_force"] = time_in_force
-
-                # Place the order
-                self.logger.info(f"Placing order with params: {order_params}")
-                return self.client.create_order(**order_params)
-                
+            return self._order_dispatch[_is_perpetual(product_id)](product_id, side, size, order_type,
+                                                                   price, time_in_force)
         except Exception as e:
             self.logger.error(f"Error placing order: {str(e)}")
             return None
 
+    def _place_order_perp(self, product_id: str, side: str, size: float, order_type: str,
+                          price: float, time_in_force: str):
+        """place_order for perpetual futures; only MARKET orders are supported"""
+        if order_type.upper() != "MARKET":
+            raise ValueError("Only MARKET orders supported for perpetual futures currently")
+        
+        # For perpetual futures, use a plain IOC market order sized in base currency
+        order_config = {
+            "market_market_ioc": {
+                "base_size": str(size)
+            }
+        }
+        
+        request = OrderRequest(self._new_client_order_id("order"), product_id, side.upper(), order_config)
+        
+        self.logger.info(f"Placing perpetual {side} market order for {size} {product_id}")
+        market_order = self.client.create_order(**request.as_kwargs())
+        self.logger.info(f"Perpetual market order response: {market_order}")
+        return market_order
+
+    def _place_order_spot(self, product_id: str, side: str, size: float, order_type: str,
+                          price: float, time_in_force: str):
+        """place_order for spot products"""
+        side = side.upper()
+        order_type = order_type.upper()
+        template_key = (side, order_type) if order_type == "MARKET" else (side, order_type, time_in_force.upper())
+        template = self._SPOT_ORDER_TEMPLATES.get(template_key)
+        if template is None:
+            raise ValueError(f"Unsupported order: {' '.join(template_key)}")
+        if order_type == "LIMIT" and price is None:
+            raise ValueError("Price must be specified for LIMIT orders")
+        
+        config_key, size_key, fixed_fields = template
+        order_config = {size_key: str(size), **fixed_fields}
+        if order_type == "LIMIT":
+            order_config["limit_price"] = str(price)
+        
+        request = OrderRequest(self._new_client_order_id("order"), product_id, side, {config_key: order_config})
+
+        # Place the order
+        self.logger.info(f"Placing order with params: {request}")
+        return self.client.create_order(**request.as_kwargs())
+
     def place_bracket_order(self, product_id, side, size, entry_price, take_profit_price, stop_loss_price):
         try:
             # Generate a unique client_order_id
-            client_order_id = f"bracket_{uuid.uuid4().hex[:16]}_{int(time.time())}"
+            client_order_id = self._new_client_order_id("bracket")
             
             # Set end time to 30 days from now
-            end_time = (datetime.utcnow() + timedelta(days=30)).isoformat() + "Z"
+            end_time = self._gtd_end_time()
 
             if side.upper() == "BUY":
                 order = orders.trigger_bracket_order_gtd_buy(
@@ -194,21 +462,18 @@ class CoinbaseService:
 
             return order
         except Exception as e:
-            print(f"Error placing bracket order: {e}")
+            self.logger.exception(f"Error placing bracket order: {e}")
             return None            
  
-    def calculate_trade_amount_and_fee(self, balance: float, price: float, is_buy: bool) -> Tuple[float, float]:
+    def _get_fee_rate(self) -> float:
         """
-        Calculate the trade amount and fee for a given balance and price.
+        Return the account's taker fee rate, falling back to DEFAULT_FEE_RATE.
         
-        :param balance: The available balance for the trade
-        :param price: The current price of the asset
-        :param is_buy: True if it's a buy order, False if it's a sell order
-        :return: A tuple of (trade_amount, fee)
+        A rate read from the transaction summary is cached for _fee_rate_cache_ttl seconds.
         """
-        # Return zeros if balance is too low
-        if balance < 5:
-            return 0.0, 0.0
+        rate, expires_at = self._fee_rate_cache
+        if rate is not None and time.time() < expires_at:
+            return rate
         
         try:
             # Get the transaction summary which includes fee rates
@@ -227,36 +492,45 @@ class CoinbaseService:
                             fee_rate = float(fee_tier['maker_fee_rate'])
                             self.logger.info(f"Using maker fee rate: {fee_rate}")
                         else:
-                            fee_rate = self.DEFAULT_FEE_RATE
                             self.logger.warning("No fee rate found in fee_tier dictionary")
+                            return self.DEFAULT_FEE_RATE
                     else:
-                        fee_rate = self.DEFAULT_FEE_RATE
                         self.logger.warning("Fee tier is not a dictionary")
+                        return self.DEFAULT_FEE_RATE
                 except Exception as e:
                     self.logger.warning(f"Error accessing fee rate: {str(e)}")
-                    fee_rate = self.DEFAULT_FEE_RATE
+                    return self.DEFAULT_FEE_RATE
             else:
-                fee_rate = self.DEFAULT_FEE_RATE
                 self.logger.warning(f"No fee_tier attribute found in summary")
-            
-            # self.logger.info(f"Using fee rate: {fee_rate}")
+                return self.DEFAULT_FEE_RATE
                 
         except Exception as e:
             self.logger.warning(f"Could not get fee rates, using default fee rate. Error: {str(e)}")
-            fee_rate = self.DEFAULT_FEE_RATE
+            return self.DEFAULT_FEE_RATE
         
-        if is_buy:
-            trade_amount = (balance / price) / (1 + fee_rate)
-            fee = balance - (trade_amount * price)
-        else:
-            fee = balance * fee_rate
-            trade_amount = balance - fee
+        # Only cache rates that actually came from the API, so a failed lookup is retried
+        self._fee_rate_cache = (fee_rate, time.time() + self._fee_rate_cache_ttl)
+        return fee_rate
+
+    def calculate_trade_amount_and_fee(self, balance: float, price: float, is_buy: bool) -> Tuple[float, float]:
+        """
+        Calculate the trade amount and fee for a given balance and price.
         
-        return trade_amount, fee
+        :param balance: The available balance for the trade
+        :param price: The current price of the asset
+        :param is_buy: True if it's a buy order, False if it's a sell order
+        :return: A tuple of (trade_amount, fee)
+        """
+        # Return zeros if balance is too low
+        if balance < MIN_TRADE_BALANCE:
+            return 0.0, 0.0
+        
+        fee_rate = self._get_fee_rate()
+        
+        return _trade_amount_and_fee(balance, price, fee_rate, is_buy)
 
     def monitor_price_and_place_bracket_order(self, product_id, target_price, size):
-        logger = logging.getLogger(__name__)
-        logger.info(f"Placing bracket order with target price {target_price}.")
+        self.logger.info(f"Placing bracket order with target price {target_price}.")
         
         for attempt in range(self.MAX_RETRIES):
             # Assuming we want to place a buy order when monitoring price
@@ -271,15 +545,15 @@ class CoinbaseService:
             
             # Check if order is not None before accessing success key
             if order and order.get("success", False):
-                logger.info(f"Bracket order placed successfully: {order}")
+                self.logger.info(f"Bracket order placed successfully: {order}")
                 return
             else:
-                logger.error(f"Failed to place order: {order}")
+                self.logger.error(f"Failed to place order: {order}")
                 if attempt < self.MAX_RETRIES - 1:  # Only sleep if we're going to retry
                     time.sleep(self.RETRY_DELAY_SECONDS)
                 continue
 
-        logger.info("Max retries reached. Unable to place bracket order.")
+        self.logger.info("Max retries reached. Unable to place bracket order.")
 
     def get_trading_pairs(self) -> List[str]:
         """
@@ -288,18 +562,20 @@ class CoinbaseService:
         Returns:
             List[str]: List of available trading pairs (e.g., ['BTC-USDC', 'ETH-USDC', ...])
         """
+        usdc_pairs, fetched_at = self._trading_pairs_cache
+        if usdc_pairs and time.time() - fetched_at < self._trading_pairs_cache_ttl:
+            return list(usdc_pairs)
+        
         try:
             # Get all products using the public endpoint
             response = self.client.get_public_products()
             
-            # Filter for active USDC pairs
-            usdc_pairs = []
-            for product in response['products']:
-                # Check if product is active and is a USDC pair
-                usdc_pairs.append(product['product_id'])
-            
-            # Sort pairs alphabetically
-            usdc_pairs.sort()
+            # Active USDC pairs, sorted alphabetically
+            usdc_pairs = sorted(
+                product['product_id'] for product in response['products']
+                if product['product_id'].endswith('-USDC') and product['status'] == 'online'
+            )
+            self._trading_pairs_cache = (usdc_pairs, time.time())
             
             self.logger.info(f"Found {len(usdc_pairs)} active USDC trading pairs")
             
@@ -307,7 +583,7 @@ class CoinbaseService:
             if usdc_pairs:
                 self.logger.debug(f"Sample pairs: {', '.join(usdc_pairs[:5])}")
             
-            return usdc_pairs
+            return list(usdc_pairs)
             
         except Exception as e:
             self.logger.error(f"Error getting trading pairs: {str(e)}")
@@ -320,6 +596,9 @@ class CoinbaseService:
         Place a market order followed by a bracket order for take profit and stop loss.
         """
         try:
+            # Connect the fill stream now so it is subscribed by the time the order fills
+            self._ensure_user_stream()
+            
             # First preview the market order
             preview = self.client.preview_market_order(
                 product_id=product_id,
@@ -332,12 +611,13 @@ class CoinbaseService:
             self.logger.info(f"Order preview response: {preview}")
             
             # Check preview response
-            if hasattr(preview, 'error_response'):
-                self.logger.error(f"Order preview failed: {preview.error_response}")
-                return {"error": preview.error_response}
+            error = _error_response(preview)
+            if error is not None:
+                self.logger.error(f"Order preview failed: {error}")
+                return {"error": error}
                 
             # Generate a unique client_order_id
-            client_order_id = f"market_{uuid.uuid4().hex[:16]}_{int(time.time())}"
+            client_order_id = self._new_client_order_id("market")
             
             # Place the initial market order
             market_order = self.client.market_order(
@@ -349,22 +629,15 @@ class CoinbaseService:
                 margin_type="CROSS" if leverage else None
             )
             
-            if hasattr(market_order, 'error_response'):
-                self.logger.error(f"Failed to place market order: {market_order.error_response}")
-                return {"error": market_order.error_response}
+            error = _error_response(market_order)
+            if error is not None:
+                self.logger.error(f"Failed to place market order: {error}")
+                return {"error": error}
             
             self.logger.info(f"Market order placed: {market_order}")
             
-            # Extract order ID - Updated this section
-            order_id = None
-            if (isinstance(market_order, dict) and 
-                'success_response' in market_order and 
-                'order_id' in market_order['success_response']):
-                order_id = market_order['success_response']['order_id']
-            elif hasattr(market_order, 'success_response'):
-                success_response = getattr(market_order, 'success_response')
-                if isinstance(success_response, dict) and 'order_id' in success_response:
-                    order_id = success_response['order_id']
+            # Extract order ID
+            order_id = _extract(market_order, 'success_response', 'order_id')
             
             if not order_id:
                 self.logger.error(f"Could not find order ID in response: {market_order}")
@@ -372,30 +645,19 @@ class CoinbaseService:
             
             self.logger.info(f"Extracted order ID: {order_id}")
             
-            # Wait briefly for market order to fill
-            time.sleep(2)
-            
-            # Get the order status
-            order_status = self.client.get_order(order_id=order_id)
+            # Poll until the market order fills instead of sleeping a fixed interval
+            is_filled, order_status = self._wait_for_fill(order_id)
             self.logger.info(f"Order status response: {order_status}")
             
-            # Check if order is filled - Updated this section
-            is_filled = False
-            if isinstance(order_status, dict) and 'order' in order_status:
-                is_filled = order_status['order'].get('status') == 'FILLED'
-            elif hasattr(order_status, 'order'):
-                order = getattr(order_status, 'order')
-                is_filled = getattr(order, 'status', None) == 'FILLED'
-            
             if not is_filled:
                 self.logger.error(f"Market order not filled: {order_status}")
                 return {"error": "Market order not filled", "market_order": str(market_order)}
 
             # Generate client_order_id for bracket order
-            bracket_client_order_id = f"bracket_{uuid.uuid4().hex[:16]}_{int(time.time())}"
+            bracket_client_order_id = self._new_client_order_id("bracket")
             
             # Set end time to 30 days from now for GTD orders
-            end_time = (datetime.utcnow() + timedelta(days=30)).isoformat() + "Z"
+            end_time = self._gtd_end_time()
             
             # Place bracket order - use opposite side of market order
             bracket_side = "SELL" if side.upper() == "BUY" else "BUY"
@@ -425,12 +687,13 @@ class CoinbaseService:
                         margin_type="CROSS" if leverage else None
                     )
                     
-                if hasattr(bracket_order, 'error_response'):
-                    self.logger.error(f"Failed to place bracket order: {bracket_order.error_response}")
+                error = _error_response(bracket_order)
+                if error is not None:
+                    self.logger.error(f"Failed to place bracket order: {error}")
                     return {
                         "error": "Failed to place bracket order",
                         "market_order": str(market_order),
-                        "bracket_error": bracket_order.error_response
+                        "bracket_error": error
                     }
                     
                 self.logger.info(f"Bracket order placed: {bracket_order}")
@@ -456,6 +719,150 @@ class CoinbaseService:
             self.logger.error(f"Error placing market order with targets: {str(e)}")
             return {"error": str(e)}
 
+    async def place_market_order_with_targets_async(self, product_id: str, side: str, size: float,
+                                                    take_profit_price: float, stop_loss_price: float,
+                                                    leverage: str = None) -> dict:
+        """
+        Non-blocking place_market_order_with_targets for asyncio callers.
+        
+        The blocking SDK calls run in a worker thread, so several products can be traded
+        concurrently with asyncio.gather.
+        """
+        return await asyncio.to_thread(self.place_market_order_with_targets, product_id, side, size,
+                                       take_profit_price, stop_loss_price, leverage)
+
+    async def _aget_order(self, order_id: str):
+        """get_order in a worker thread"""
+        return await asyncio.to_thread(self.client.get_order, order_id=order_id)
+
+    async def get_orders_async(self, order_ids: List[str]) -> Dict[str, object]:
+        """Fetch several orders concurrently, keyed by order ID"""
+        responses = await asyncio.gather(*(self._aget_order(order_id) for order_id in order_ids))
+        return dict(zip(order_ids, responses))
+
+    def _ensure_user_stream(self) -> bool:
+        """
+        Make sure the user-channel WebSocket that reports fills is open; False if it isn't.
+        
+        A stream that has closed (the SDK doesn't reconnect after a clean server-side
+        close) is reopened. After a failed connect, callers poll REST for
+        WS_RETRY_BACKOFF_SECONDS before the next attempt.
+        """
+        with self._ws_lock:
+            if self._ws_user is not None:
+                if _ws_is_open(self._ws_user):
+                    return True
+                self.logger.info("User WebSocket closed, reconnecting")
+                self._close_user_stream(self._ws_user)
+                self._ws_user = None
+            if time.monotonic() < self._ws_retry_at:
+                return False
+            
+            ws_user = WSUserClient(api_key=self.client.api_key, api_secret=self.client.api_secret,
+                                   on_message=self._on_user_message, timeout=self.WS_OPEN_TIMEOUT_SECONDS)
+            try:
+                ws_user.open()
+                ws_user.user(product_ids=[])
+                # Heartbeats keep the connection from idling out between fills
+                ws_user.heartbeats()
+            except Exception as e:
+                self.logger.warning(f"User WebSocket unavailable, polling for fills instead: {str(e)}")
+                self._close_user_stream(ws_user)
+                self._ws_retry_at = time.monotonic() + self.WS_RETRY_BACKOFF_SECONDS
+                return False
+            self._ws_user = ws_user
+            return True
+    
+    def _user_stream_open(self) -> bool:
+        """True if the user WebSocket is connected right now (no reconnect attempt)"""
+        ws_user = self._ws_user
+        return ws_user is not None and _ws_is_open(ws_user)
+    
+    def _close_user_stream(self, ws_user):
+        """Close a user WebSocket client and stop its event-loop thread, even if it never connected"""
+        try:
+            if _ws_is_open(ws_user):
+                ws_user.close()
+                return
+        except Exception as e:
+            self.logger.warning(f"Error closing user WebSocket: {str(e)}")
+        # close() refuses to run without an open socket, which would leave the loop thread behind
+        loop = ws_user.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+            ws_user.thread.join(timeout=self.WS_OPEN_TIMEOUT_SECONDS)
+            if not ws_user.thread.is_alive():
+                loop.close()
+
+    def _order_event(self, order_id: str) -> threading.Event:
+        """Event set once order_id reaches a terminal status; only the most recent orders are tracked"""
+        with self._order_events_lock:
+            event = self._order_events.get(order_id)
+            if event is None:
+                event = self._order_events[order_id] = threading.Event()
+                if len(self._order_events) > self.MAX_TRACKED_ORDERS:
+                    stale_id, _ = self._order_events.popitem(last=False)
+                    self._order_updates.pop(stale_id, None)
+            return event
+
+    def cancel_monitor(self):
+        """Stop every running monitor_limit_order_and_place_bracket loop without waiting for its next poll"""
+        with self._order_events_lock:
+            for wake, (_, stop) in self._monitors.items():
+                stop.set()
+                wake.set()
+
+    def _on_user_message(self, message: str):
+        """WebSocket callback: record orders that reached a terminal status"""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if data.get('channel') != 'user':
+            return
+        
+        for event in data.get('events', []):
+            for order in event.get('orders', []):
+                if order.get('status') in TERMINAL_ORDER_STATUSES and order.get('order_id'):
+                    # The update can arrive before the REST response, so record it either way
+                    order_event = self._order_event(order['order_id'])
+                    self._order_updates[order['order_id']] = order
+                    order_event.set()
+                    self._wake_monitors(order['order_id'])
+
+    def _wake_monitors(self, order_id: str):
+        """Wake the running monitors of order_id so they re-check it immediately"""
+        with self._order_events_lock:
+            for wake, (monitored_id, _) in self._monitors.items():
+                if monitored_id == order_id:
+                    wake.set()
+
+    def _wait_for_fill(self, order_id: str) -> Tuple[bool, object]:
+        """
+        Wait for an order to be FILLED.
+        
+        Waits on the user-channel order event when the stream is connected, then falls back
+        to polling get_order at most FILL_POLL_ATTEMPTS times.
+        
+        Returns:
+            Tuple[bool, object]: (is_filled, order status - the get_order response, or
+                {'order': ...} from the user channel)
+        """
+        if self._user_stream_open():
+            if self._order_event(order_id).wait(timeout=self.FILL_EVENT_TIMEOUT_SECONDS):
+                order = self._order_updates.get(order_id, {})
+                return order.get('status') == 'FILLED', {'order': order}
+        
+        for attempt in range(self.FILL_POLL_ATTEMPTS):
+            order_status = self.client.get_order(order_id=order_id)
+            
+            if _extract(order_status, 'order', 'status') == 'FILLED':
+                return True, order_status
+            if attempt < self.FILL_POLL_ATTEMPTS - 1:
+                time.sleep(self.FILL_POLL_INTERVAL_SECONDS)
+        
+        return False, order_status
+
     def place_limit_order_with_targets(self, product_id: str, side: str, size: float, 
                                      entry_price: float, take_profit_price: float, 
                                      stop_loss_price: float, leverage: str = None) -> dict:
@@ -488,12 +895,13 @@ class CoinbaseService:
             self.logger.info(f"Order preview response: {preview}")
             
             # Check preview response
-            if hasattr(preview, 'error_response'):
-                self.logger.error(f"Order preview failed: {preview.error_response}")
-                return {"error": preview.error_response}
+            error = _error_response(preview)
+            if error is not None:
+                self.logger.error(f"Order preview failed: {error}")
+                return {"error": error}
                 
             # Generate a unique client_order_id
-            client_order_id = f"limit_{uuid.uuid4().hex[:16]}_{int(time.time())}"
+            client_order_id = self._new_client_order_id("limit")
             
             # Place the initial limit order
             limit_order = self.client.limit_order_gtc(
@@ -506,22 +914,15 @@ class CoinbaseService:
                 margin_type="CROSS" if leverage else None
             )
             
-            if hasattr(limit_order, 'error_response'):
-                self.logger.error(f"Failed to place limit order: {limit_order.error_response}")
-                return {"error": limit_order.error_response}
+            error = _error_response(limit_order)
+            if error is not None:
+                self.logger.error(f"Failed to place limit order: {error}")
+                return {"error": error}
             
             self.logger.info(f"Limit order placed: {limit_order}")
             
             # Extract order ID
-            order_id = None
-            if (isinstance(limit_order, dict) and 
-                'success_response' in limit_order and 
-                'order_id' in limit_order['success_response']):
-                order_id = limit_order['success_response']['order_id']
-            elif hasattr(limit_order, 'success_response'):
-                success_response = getattr(limit_order, 'success_response')
-                if isinstance(success_response, dict) and 'order_id' in success_response:
-                    order_id = success_response['order_id']
+            order_id = _extract(limit_order, 'success_response', 'order_id')
             
             if not order_id:
                 self.logger.error(f"Could not find order ID in response: {limit_order}")
@@ -567,14 +968,8 @@ class CoinbaseService:
             self.logger.info(f"Order status response: {order_status}")
             
             # Check if order is filled
-            is_filled = False
-            if isinstance(order_status, dict) and 'order' in order_status:
-                is_filled = order_status['order'].get('status') == 'FILLED'
-                side = order_status['order'].get('side')
-            elif hasattr(order_status, 'order'):
-                order = getattr(order_status, 'order')
-                is_filled = getattr(order, 'status', None) == 'FILLED'
-                side = getattr(order, 'side', None)
+            is_filled = _extract(order_status, 'order', 'status') == 'FILLED'
+            side = _extract(order_status, 'order', 'side')
             
             if not is_filled:
                 return {
@@ -584,10 +979,10 @@ class CoinbaseService:
                 }
             
             # Generate client_order_id for bracket order
-            bracket_client_order_id = f"bracket_{uuid.uuid4().hex[:16]}_{int(time.time())}"
+            bracket_client_order_id = self._new_client_order_id("bracket")
             
             # Set end time to 30 days from now for GTD orders
-            end_time = (datetime.utcnow() + timedelta(days=30)).isoformat() + "Z"
+            end_time = self._gtd_end_time()
             
             # Place bracket order - use opposite side of the filled limit order
             bracket_side = "SELL" if side == "BUY" else "BUY"
@@ -617,11 +1012,12 @@ class CoinbaseService:
                         margin_type="CROSS" if leverage else None
                     )
                     
-                if hasattr(bracket_order, 'error_response'):
-                    self.logger.error(f"Failed to place bracket order: {bracket_order.error_response}")
+                error = _error_response(bracket_order)
+                if error is not None:
+                    self.logger.error(f"Failed to place bracket order: {error}")
                     return {
                         "error": "Failed to place bracket order",
-                        "bracket_error": bracket_order.error_response
+                        "bracket_error": error
                     }
                     
                 self.logger.info(f"Bracket order placed: {bracket_order}")
@@ -642,6 +1038,26 @@ class CoinbaseService:
             self.logger.error(f"Error checking order status: {str(e)}")
             return {"error": str(e)}
 
+    def get_orders_bulk(self, order_ids: List[str]) -> Dict[str, object]:
+        """
+        Fetch several orders with a single list_orders request.
+        
+        Args:
+            order_ids (List[str]): Order IDs to look up
+            
+        Returns:
+            Dict[str, object]: Order details keyed by order ID; IDs the API didn't return are absent
+        """
+        if not order_ids:
+            return {}
+        
+        try:
+            response = self.client.list_orders(order_ids=list(order_ids), limit=len(order_ids))
+            return {_extract(order, 'order_id'): order for order in (_extract(response, 'orders') or [])}
+        except Exception as e:
+            self.logger.error(f"Error fetching orders {order_ids}: {str(e)}")
+            return {}
+
     def cancel_all_orders(self, product_id: str = None):
         """
         Cancel all open orders for a given product_id or all products if none specified.
@@ -653,20 +1069,13 @@ class CoinbaseService:
             self.logger.info("Fetching open orders...")
             
             # First get the INTX portfolio UUID
-            ports = self.client.get_portfolios()
-            portfolio_uuid = None
-            
-            self.logger.info("Available portfolios:")
-            for p in ports['portfolios']:
-                self.logger.info(f"Portfolio type: {p['type']}, UUID: {p['uuid']}")
-                if p['type'] == "INTX":
-                    portfolio_uuid = p['uuid']
+            portfolio_uuid = self._get_portfolio_uuid("INTX")
             
             if not portfolio_uuid:
                 self.logger.error("Could not find INTX portfolio")
                 return
             
-            self.logger.info(f"Using portfolio UUID: {portfolio_uuid}")
+            self.logger.info("Using portfolio UUID: %s", portfolio_uuid)
             
             # Get open orders
             open_orders = self.client.list_orders(
@@ -675,58 +1084,52 @@ class CoinbaseService:
                 portfolio_uuid=portfolio_uuid
             )
             
-            # Convert response to dictionary if needed
-            if not isinstance(open_orders, dict):
-                if hasattr(open_orders, '__dict__'):
-                    open_orders = vars(open_orders)
-                else:
-                    open_orders = {'orders': []}
-            
-            self.logger.info(f"Raw response: {open_orders}")
+            open_orders = _as_dict(open_orders)
+            self.logger.debug("Raw response: %s", open_orders)
             
-            if 'orders' not in open_orders or not open_orders['orders']:
+            orders = [_as_dict(order) for order in open_orders.get('orders') or []]
+            if not orders:
                 self.logger.info("No open orders found")
                 return
             
-            # Extract order IDs and cancel each order individually
-            for order in open_orders['orders']:
-                # Handle both dictionary and object types
-                if isinstance(order, dict):
-                    order_id = order.get('order_id')
-                    order_type = order.get('order_type')
-                    attached_order_id = order.get('attached_order_id')
-                    originating_order_id = order.get('originating_order_id')
-                else:
-                    order_id = getattr(order, 'order_id', None)
-                    order_type = getattr(order, 'order_type', None)
-                    attached_order_id = getattr(order, 'attached_order_id', None)
-                    originating_order_id = getattr(order, 'originating_order_id', None)
-                
+            # Collect every order ID (plus attached/originating legs of brackets) and
+            # cancel them all in one request
+            order_ids = []
+            for order in orders:
+                order_id = order.get('order_id')
                 if order_id:
-                    try:
-                        # First try to cancel any bracket orders
-                        if order_type == 'BRACKET':
-                            self.logger.info(f"Cancelling bracket order {order_id}")
-                            # Cancel the bracket order and any attached orders
-                            if attached_order_id:
-                                self.logger.info(f"Cancelling attached order {attached_order_id}")
-                                self.client.cancel_orders(order_ids=[attached_order_id])
-                            if originating_order_id:
-                                self.logger.info(f"Cancelling originating order {originating_order_id}")
-                                self.client.cancel_orders(order_ids=[originating_order_id])
-                        
-                        # Cancel the main order
-                        self.logger.info(f"Cancelling order {order_id}")
-                        result = self.client.cancel_orders(order_ids=[order_id])
-                        self.logger.info(f"Cancel result for order {order_id}: {result}")
-                        
-                        # Wait briefly to ensure the cancel is processed
-                        time.sleep(0.5)
-                        
-                    except Exception as e:
-                        self.logger.error(f"Error cancelling order {order_id}: {str(e)}")
-                        continue
+                    if order.get('order_type') == 'BRACKET':
+                        order_ids.extend(leg for leg in (order.get('attached_order_id'),
+                                                         order.get('originating_order_id')) if leg)
+                    order_ids.append(order_id)
+            
+            # Drop duplicates (legs can also be listed as orders themselves), keeping order
+            order_ids = list(dict.fromkeys(order_ids))
+            
+            # batch_cancel accepts a limited number of IDs per request
+            all_cancelled = True
+            cancel_start = time.perf_counter()
+            for i in range(0, len(order_ids), CANCEL_BATCH_SIZE):
+                batch = order_ids[i:i + CANCEL_BATCH_SIZE]
+                try:
+                    self.logger.debug("Cancelling %d orders: %s", len(batch), batch)
+                    result = self.client.cancel_orders(order_ids=batch)
+                    self.logger.debug("Cancel result: %s", result)
+                    # The response carries a success flag per order ID
+                    cancelled = {_extract(r, 'order_id') for r in (_extract(result, 'results') or [])
+                                 if _extract(r, 'success')}
+                    all_cancelled = all_cancelled and cancelled.issuperset(batch)
+                except Exception as e:
+                    self.logger.error("Error cancelling orders %s: %s", batch, e)
+                    all_cancelled = False
             
+            self.logger.info("Cancelled %d orders in %.3fs", len(order_ids), time.perf_counter() - cancel_start)
+            
+            if all_cancelled:
+                self.logger.info("All orders successfully cancelled")
+                return
+            
+            # Some cancels failed or were ambiguous - check what is still open
             # Verify all orders are cancelled
             time.sleep(1)  # Wait for cancellations to process
             verify_orders = self.client.list_orders(
@@ -735,26 +1138,16 @@ class CoinbaseService:
                 portfolio_uuid=portfolio_uuid
             )
             
-            # Convert verification response to dictionary if needed
-            if not isinstance(verify_orders, dict):
-                if hasattr(verify_orders, '__dict__'):
-                    verify_orders = vars(verify_orders)
-                else:
-                    verify_orders = {'orders': []}
-            
-            remaining_orders = verify_orders.get('orders', [])
+            remaining_orders = [_as_dict(order) for order in _as_dict(verify_orders).get('orders') or []]
             if remaining_orders:
-                self.logger.warning(f"Some orders remain uncancelled: {len(remaining_orders)} orders")
+                self.logger.warning("Some orders remain uncancelled: %d orders", len(remaining_orders))
                 for order in remaining_orders:
-                    if isinstance(order, dict):
-                        self.logger.warning(f"Uncancelled order: {order.get('order_id')} - {order.get('order_type')}")
-                    else:
-                        self.logger.warning(f"Uncancelled order: {getattr(order, 'order_id', None)} - {getattr(order, 'order_type', None)}")
+                    self.logger.warning("Uncancelled order: %s - %s", order.get('order_id'), order.get('order_type'))
             else:
                 self.logger.info("All orders successfully cancelled")
             
         except Exception as e:
-            self.logger.error(f"Error cancelling orders: {str(e)}")
+            self.logger.error("Error cancelling orders: %s", e)
             self.logger.exception("Full error details:")
 
     def close_all_positions(self, product_id: str = None, timeout: int = 30):
@@ -766,85 +1159,49 @@ class CoinbaseService:
             product_id (str, optional): The trading pair to close positions for
             timeout (int, optional): Maximum time in seconds to wait for all positions to close
         """
+        from concurrent.futures import ThreadPoolExecutor, wait
+        
+        def fetch_portfolio():
+            # Get the INTX portfolio UUID, then its positions
+            portfolio_uuid = self._get_portfolio_uuid("INTX")
+            if not portfolio_uuid:
+                return None
+            return self.client.get_portfolio_breakdown(portfolio_uuid=portfolio_uuid)
+        
         try:
-            # First cancel all open orders - don't wait between cancellations
+            # First cancel all open orders. The positions don't depend on the cancels, so
+            # fetch them meanwhile; both finish before any position is closed
             self.logger.info("Cancelling all open orders first...")
-            self.cancel_all_orders(product_id)
-            
             self.logger.info("Fetching open positions...")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                cancel_future = executor.submit(self.cancel_all_orders, product_id)
+                portfolio_future = executor.submit(fetch_portfolio)
+                cancel_future.result()
+                portfolio = portfolio_future.result()
             
-            # Get the INTX portfolio UUID
-            ports = self.client.get_portfolios()
-            portfolio_uuid = None
-            
-            for p in ports['portfolios']:
-                if p['type'] == "INTX":
-                    portfolio_uuid = p['uuid']
-                    break
-            
-            if not portfolio_uuid:
+            if portfolio is None:
                 self.logger.error("Could not find INTX portfolio")
                 return
             
-            # Get portfolio positions
-            portfolio = self.client.get_portfolio_breakdown(portfolio_uuid=portfolio_uuid)
-            
-            # Initialize positions as empty list
-            positions = []
-            
-            # Convert portfolio to dictionary if needed
-            if not isinstance(portfolio, dict):
-                if hasattr(portfolio, '__dict__'):
-                    portfolio = vars(portfolio)
-                else:
-                    self.logger.error("Invalid portfolio response format")
-                    return
-            
-            # Handle breakdown object
-            breakdown = portfolio.get('breakdown')
+            breakdown = _as_dict(portfolio).get('breakdown')
             if breakdown is None:
                 self.logger.error("No breakdown found in portfolio")
                 return
             
-            if not isinstance(breakdown, dict):
-                if hasattr(breakdown, '__dict__'):
-                    breakdown = vars(breakdown)
-                    positions = breakdown.get('perp_positions', [])
-                elif hasattr(breakdown, 'perp_positions'):
-                    positions = breakdown.perp_positions
-                else:
-                    self.logger.error("Invalid breakdown format")
-                    return
-            else:
-                positions = breakdown.get('perp_positions', [])
-            
-            # Convert positions to list if it's not already
-            if not isinstance(positions, list):
-                if hasattr(positions, '__iter__'):
-                    positions = list(positions)
-                else:
-                    self.logger.error("Invalid positions format")
-                    return
+            positions = [_as_dict(position) for position in _as_dict(breakdown).get('perp_positions') or []]
             
             if not positions:
                 self.logger.info("No perpetual positions found")
                 return
             
-            self.logger.info(f"Found {len(positions)} perpetual positions to close")
+            self.logger.info("Found %d perpetual positions to close", len(positions))
             
             def close_single_position(position):
                 """Helper function to close a single position with retries"""
-                # Handle both dictionary and object types
-                if isinstance(position, dict):
-                    position_symbol = position.get('symbol')
-                    position_size = float(position.get('net_size', '0'))
-                    position_side = position.get('position_side', '')
-                    leverage = position.get('leverage', '1')
-                else:
-                    position_symbol = getattr(position, 'symbol', None)
-                    position_size = float(getattr(position, 'net_size', '0'))
-                    position_side = getattr(position, 'position_side', '')
-                    leverage = getattr(position, 'leverage', '1')
+                position_symbol = position.get('symbol')
+                position_size = float(position.get('net_size', '0'))
+                position_side = position.get('position_side', '')
+                leverage = position.get('leverage', '1')
                 
                 if not position_symbol or abs(position_size) <= 0:
                     return
@@ -852,16 +1209,22 @@ class CoinbaseService:
                 if product_id and position_symbol != product_id:
                     return
                 
-                # Try closing with different size percentages if needed
-                size_percentages = [1.0, 0.99, 0.98, 0.95]  # Try 100%, 99%, 98%, 95% of position
+                # The breakdown was fetched moments ago, so the first attempt closes the full size.
+                # On PREVIEW_INSUFFICIENT_FUNDS the shortfall doubles per attempt (100%, 99%, 97%,
+                # 93%), after a jittered backoff that lets margin released by the cancels settle
+                size_percentages = [round(1.0 - 0.01 * (2 ** attempt - 1), 2) for attempt in range(CLOSE_ATTEMPTS)]
+                
+                side = "BUY" if position_side == "FUTURES_POSITION_SIDE_SHORT" else "SELL"
                 
-                for size_pct in size_percentages:
+                for attempt, size_pct in enumerate(size_percentages):
+                    if attempt:
+                        time.sleep(CLOSE_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
                     try:
-                        client_order_id = f"close_{uuid.uuid4().hex[:16]}_{int(time.time())}"
-                        side = "BUY" if position_side == "FUTURES_POSITION_SIDE_SHORT" else "SELL"
+                        client_order_id = self._new_client_order_id("close")
                         close_size = abs(position_size) * size_pct
                         
-                        self.logger.info(f"Attempting to close {position_side} position for {position_symbol}: {close_size} ({size_pct*100}%) using {side} order")
+                        self.logger.info("Attempting to close %s position for %s: %s (%s%%) using %s order",
+                                         position_side, position_symbol, close_size, size_pct * 100, side)
                         
                         order_config = {
                             "market_market_ioc": {
@@ -877,20 +1240,21 @@ class CoinbaseService:
                             leverage=leverage,
                             margin_type="CROSS"
                         )
+                        result = _as_dict(result)
                         
-                        if isinstance(result, dict) and result.get('success', True):
-                            self.logger.info(f"Successfully closed position for {position_symbol} with {size_pct*100}% size")
+                        if result.get('success', True):
+                            self.logger.info("Successfully closed position for %s with %s%% size", position_symbol, size_pct * 100)
                             return True
                         
-                        error_response = result.get('error_response', {}) if isinstance(result, dict) else str(result)
-                        self.logger.warning(f"Failed to close position with {size_pct*100}% size: {error_response}")
+                        error_response = result.get('error_response', {})
+                        self.logger.warning("Failed to close position with %s%% size: %s", size_pct * 100, error_response)
                         
                         # If error is not related to insufficient funds, break the loop
                         if 'PREVIEW_INSUFFICIENT_FUNDS' not in str(error_response):
                             break
                             
                     except Exception as e:
-                        self.logger.error(f"Error closing position for {position_symbol} with {size_pct*100}% size: {str(e)}")
+                        self.logger.error("Error closing position for %s with %s%% size: %s", position_symbol, size_pct * 100, e)
                         continue
                 
                 return False
@@ -911,15 +1275,23 @@ class CoinbaseService:
                 
                 # Log results
                 success_count = sum(1 for future in done if future.result())
-                self.logger.info(f"Successfully closed {success_count} out of {len(positions)} positions")
+                self.logger.info("Successfully closed %d out of %d positions", success_count, len(positions))
                 
                 if not_done:
-                    self.logger.warning(f"{len(not_done)} positions did not close within the timeout period")
+                    self.logger.warning("%d positions did not close within the timeout period", len(not_done))
             
         except Exception as e:
-            self.logger.error(f"Error closing positions: {str(e)}")
+            self.logger.error("Error closing positions: %s", e)
             self.logger.exception("Full error details:")
 
+    async def cancel_all_orders_async(self, product_id: str = None):
+        """Non-blocking cancel_all_orders for asyncio callers (runs in a worker thread)"""
+        return await asyncio.to_thread(self.cancel_all_orders, product_id)
+
+    async def close_all_positions_async(self, product_id: str = None, timeout: int = 30):
+        """Non-blocking close_all_positions for asyncio callers (runs in a worker thread)"""
+        return await asyncio.to_thread(self.close_all_positions, product_id, timeout)
+
     def monitor_limit_order_and_place_bracket(self, product_id: str, order_id: str, size: float,
                                           take_profit_price: float, stop_loss_price: float,
                                           leverage: str = None, max_wait_time: int = 3600) -> dict:
@@ -943,22 +1315,41 @@ class CoinbaseService:
         
         self.logger.info(f"Starting to monitor limit order {order_id}")
         
+        # With the user stream connected, a terminal update wakes the loop immediately and
+        # REST is only a slow safety net; otherwise poll every check_interval seconds
+        order_event = self._order_event(order_id) if self._ensure_user_stream() else None
+        wake, stop = threading.Event(), threading.Event()
+        with self._order_events_lock:
+            self._monitors[wake] = (order_id, stop)
+        
+        try:
+            return self._monitor_limit_order(product_id, order_id, size, take_profit_price,
+                                             stop_loss_price, leverage, max_wait_time,
+                                             start_time, check_interval, order_event, wake, stop)
+        finally:
+            with self._order_events_lock:
+                del self._monitors[wake]
+
+    def _monitor_limit_order(self, product_id, order_id, size, take_profit_price, stop_loss_price,
+                             leverage, max_wait_time, start_time, check_interval, order_event,
+                             wake, stop) -> dict:
+        """
+        Polling loop of monitor_limit_order_and_place_bracket.
+        
+        `wake` is set by a user-channel update for the order or by cancel_monitor(), which
+        also sets `stop`.
+        """
         while time.time() - start_time < max_wait_time:
             try:
+                # Cleared before the REST check, so an update arriving after it still wakes the wait
+                wake.clear()
+                
                 # Check order status
                 order_status = self.client.get_order(order_id=order_id)
                 
                 # Extract status and side
-                status = None
-                side = None
-                
-                if isinstance(order_status, dict) and 'order' in order_status:
-                    status = order_status['order'].get('status')
-                    side = order_status['order'].get('side')
-                elif hasattr(order_status, 'order'):
-                    order = getattr(order_status, 'order')
-                    status = getattr(order, 'status', None)
-                    side = getattr(order, 'side', None)
+                status = _extract(order_status, 'order', 'status')
+                side = _extract(order_status, 'order', 'side')
                 
                 self.logger.info(f"Order status: {status}")
                 
@@ -966,10 +1357,10 @@ class CoinbaseService:
                     self.logger.info("Limit order filled! Placing bracket orders...")
                     
                     # Generate client_order_id for bracket order
-                    bracket_client_order_id = f"bracket_{uuid.uuid4().hex[:16]}_{int(time.time())}"
+                    bracket_client_order_id = self._new_client_order_id("bracket")
                     
                     # Set end time to 30 days from now for GTD orders
-                    end_time = (datetime.utcnow() + timedelta(days=30)).isoformat() + "Z"
+                    end_time = self._gtd_end_time()
                     
                     # Place bracket order - use opposite side of the filled limit order
                     bracket_side = "SELL" if side == "BUY" else "BUY"
@@ -998,12 +1389,13 @@ class CoinbaseService:
                                 margin_type="CROSS" if leverage else None
                             )
                             
-                        if hasattr(bracket_order, 'error_response'):
-                            self.logger.error(f"Failed to place bracket order: {bracket_order.error_response}")
+                        error = _error_response(bracket_order)
+                        if error is not None:
+                            self.logger.error(f"Failed to place bracket order: {error}")
                             return {
                                 "status": "error",
                                 "message": "Limit order filled but failed to place bracket orders",
-                                "error": bracket_order.error_response
+                                "error": error
                             }
                             
                         self.logger.info(f"Bracket order placed successfully: {bracket_order}")
@@ -1031,7 +1423,20 @@ class CoinbaseService:
                     }
                 
                 # Wait before next check
-                time.sleep(check_interval)
+                # (once the event has fired, REST just hasn't caught up yet - back to polling;
+                # likewise if the stream has dropped, since no event would arrive)
+                if order_event is not None and not order_event.is_set() and self._user_stream_open():
+                    remaining = max_wait_time - (time.time() - start_time)
+                    wake.wait(timeout=max(0, min(self.MONITOR_SAFETY_POLL_SECONDS, remaining)))
+                else:
+                    wake.wait(check_interval)
+                
+                if stop.is_set():
+                    self.logger.info(f"Stopped monitoring limit order {order_id}")
+                    return {
+                        "status": "cancelled",
+                        "message": "Monitoring cancelled before fill"
+                    }
                 
             except Exception as e:
                 self.logger.error(f"Error monitoring order: {str(e)}")
@@ -1055,13 +1460,7 @@ class CoinbaseService:
         """
         try:
             # Get the INTX portfolio UUID
-            ports = self.client.get_portfolios()
-            portfolio_uuid = None
-            
-            for p in ports['portfolios']:
-                if p['type'] == "INTX":
-                    portfolio_uuid = p['uuid']
-                    break
+            portfolio_uuid = self._get_portfolio_uuid("INTX")
             
             if not portfolio_uuid:
                 self.logger.error("Could not find INTX portfolio")
@@ -1075,21 +1474,21 @@ class CoinbaseService:
             )
             
             # Convert orders to list of trade dictionaries
-            trades = []
-            
-            if isinstance(orders, dict) and 'orders' in orders:
-                for order in orders['orders']:
-                    # Extract the trade details
-                    trade_time = order.get('created_time') or order.get('completion_time')
-                    if trade_time:
-                        trade = {
-                            'trade_time': int(datetime.strptime(trade_time, "%Y-%m-%dT%H:%M:%S.%fZ").timestamp()),
-                            'side': order.get('side', ''),
-                            'price': order.get('average_filled_price') or order.get('limit_price'),
-                            'size': order.get('filled_size') or order.get('base_size'),
-                            'product_id': order.get('product_id', '')
-                        }
-                        trades.append(trade)
+            orders = [_as_dict(order) for order in _as_dict(orders).get('orders') or []]
+            
+            # fromisoformat is C-implemented and, unlike the naive strptime parse, keeps
+            # the 'Z' as UTC instead of treating the time as local
+            trades = [
+                {
+                    'trade_time': int(datetime.fromisoformat(trade_time).timestamp()),
+                    'side': order.get('side', ''),
+                    'price': order.get('average_filled_price') or order.get('limit_price'),
+                    'size': order.get('filled_size') or order.get('base_size'),
+                    'product_id': order.get('product_id', '')
+                }
+                for order in orders
+                if (trade_time := order.get('created_time') or order.get('completion_time'))
+            ]
             
             return trades
             
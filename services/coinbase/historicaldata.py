@@ -1,12 +1,15 @@
 from coinbase.rest import RESTClient
 from coinbase.rest import market_data
-from datetime import datetime, timedelta
+from datetime import datetime
 import requests
+import numpy as np
 import logging
 import time
 import os
-import json
-import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from typing import List, Tuple, Dict, Optional
 
 CHUNK_SIZE_CANDLES = {
@@ -20,8 +23,46 @@ CHUNK_SIZE_CANDLES = {
     "ONE_DAY": 7200,  # 24 candles (12 days)
 }
 
+CANDLE_FIELDS = ("start", "time", "low", "high", "open", "close", "volume")
+
+MAX_FETCH_WORKERS = 8  # concurrent candle requests per get_historical_data call
+FETCH_RATE_PER_SECOND = 10  # candle requests per second across all HistoricalData instances
+RATE_LIMIT_RESERVE = 2  # pause until the window resets once this few requests remain
+
 CACHE_DIR = "candle_data"
-CACHE_TTL = 3600  # Cache time-to-live in seconds (1 hour)
+CACHE_DB = "candles.db"
+FINALIZED_AGE = 3600  # seconds after which a range's candles no longer change
+
+class _TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the token now (possibly going negative) and sleep off the deficit outside the lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back every acquire() for at least `seconds`, then resume at the normal rate."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+_rate_limiter = _TokenBucket(FETCH_RATE_PER_SECOND)
 
 class HistoricalData:
     
@@ -31,58 +72,85 @@ class HistoricalData:
         self._init_cache()
 
     def _init_cache(self):
-        """Initialize the cache directory if it doesn't exist."""
+        """Open the SQLite candle store, creating the cache directory and tables if needed."""
         if not os.path.exists(CACHE_DIR):
             os.makedirs(CACHE_DIR)
             self.logger.info(f"Created cache directory at {CACHE_DIR}")
-
-    def _get_cache_key(self, product_id: str, start: int, end: int, granularity: str) -> str:
-        """Generate a unique cache key for the request."""
-        # Round timestamps to the nearest hour to improve cache hits, except for the last hour
-        start_hour = start - (start % 3600)
-        # Don't round the end time if it's within the last hour
-        current_time = int(time.time())
-        if current_time - end < 3600:
-            end_hour = end  # Use exact timestamp for recent data
-        else:
-            end_hour = end - (end % 3600)
-        key_parts = f"{product_id}_{start_hour}_{end_hour}_{granularity}"
-        cache_key = hashlib.md5(key_parts.encode()).hexdigest()
-        self.logger.debug(f"Generated cache key {cache_key} for {product_id} from {datetime.fromtimestamp(start)} to {datetime.fromtimestamp(end)}")
-        return cache_key
-
-    def _get_cached_data(self, cache_key: str, end_timestamp: int) -> Optional[List[dict]]:
-        """Retrieve cached data if it exists and is not expired."""
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
         
-        if not os.path.exists(cache_file):
-            self.logger.debug(f"Cache miss: {cache_key}")
+        # Autocommit mode; writes are grouped in explicit transactions. WAL lets readers
+        # proceed while a write is in progress
+        self._db = sqlite3.connect(os.path.join(CACHE_DIR, CACHE_DB), isolation_level=None,
+                                   check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    product_id TEXT NOT NULL,
+                    granularity TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    low TEXT, high TEXT, open TEXT, close TEXT, volume TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (product_id, granularity, start)
+                ) WITHOUT ROWID
+            """)
+            # Ranges that were fetched, so a range with no candles (e.g. before a listing)
+            # still counts as cached
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS fetched_ranges (
+                    product_id TEXT NOT NULL,
+                    granularity TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    end INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (product_id, granularity, start, end)
+                ) WITHOUT ROWID
+            """)
+
+    def _get_cached_data(self, product_id: str, start: int, end: int, granularity: str,
+                         now: Optional[float] = None) -> Optional[List[dict]]:
+        """
+        Retrieve the candles in [start, end] if a fetch covering the range is cached.
+
+        Only ranges that were already finalized when fetched are cached, and historical
+        candles never change, so cached ranges don't expire.
+
+        `now` lets callers probing many windows read the clock once.
+        """
+        if now is None:
+            now = time.time()
+        # If this request includes current time period, don't use cache
+        if now - end < FINALIZED_AGE:  # Within the last hour
+            self.logger.debug(f"Skipping cache for recent data: {product_id} {start}-{end}")
             return None
 
         try:
-            with open(cache_file, 'r') as f:
-                cached_data = json.load(f)
-
-            # Check if cache is expired
-            if time.time() - cached_data['timestamp'] > CACHE_TTL:
-                self.logger.debug(f"Cache expired: {cache_key}")
-                os.remove(cache_file)
-                return None
-
-            # If this request includes current time period, don't use cache
-            current_time = int(time.time())
-            if current_time - end_timestamp < 3600:  # Within the last hour
-                self.logger.debug(f"Skipping cache for recent data: {cache_key}")
-                return None
-
-            self.logger.debug(f"Cache hit: {cache_key}")
-            return cached_data['candles']
-        except Exception as e:
-            self.logger.error(f"Error reading cache file: {e}")
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
+            with self._db_lock:
+                covered = self._db.execute(
+                    "SELECT 1 FROM fetched_ranges WHERE product_id = ? AND granularity = ? "
+                    "AND start <= ? AND end >= ? AND fetched_at - end >= ? LIMIT 1",
+                    (product_id, granularity, start, end, FINALIZED_AGE),
+                ).fetchone()
+                if covered is None:
+                    self.logger.debug(f"Cache miss: {product_id} {start}-{end}")
+                    return None
+                rows = self._db.execute(
+                    "SELECT start, low, high, open, close, volume FROM candles "
+                    "WHERE product_id = ? AND granularity = ? AND start BETWEEN ? AND ? ORDER BY start",
+                    (product_id, granularity, start, end),
+                ).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading candle cache: {e}")
             return None
 
+        self.logger.debug(f"Cache hit: {product_id} {start}-{end}")
+        # Candles come back from the API with string fields; keep returning them that way
+        return [
+            {'start': str(ts), 'time': str(ts), 'low': low, 'high': high, 'open': open_, 'close': close, 'volume': volume}
+            for ts, low, high, open_, close, volume in rows
+        ]
+
     def _convert_candle_to_dict(self, candle) -> dict:
         """Convert a Candle object to a dictionary."""
         candle_dict = {
@@ -96,98 +164,137 @@ class HistoricalData:
         }
         return candle_dict
 
-    def _cache_data(self, cache_key: str, candles: List[dict]):
-        """Cache the candle data to a file."""
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    def _cache_data(self, product_id: str, start: int, end: int, granularity: str, candles: List[dict]):
+        """Store the candles fetched for [start, end] in one transaction."""
+        fetched_at = time.time()
         try:
-            # Convert Candle objects to dictionaries if needed
-            serializable_candles = [
-                self._convert_candle_to_dict(candle) if not isinstance(candle, dict) else candle
-                for candle in candles
-            ]
-            cache_data = {
-                'timestamp': time.time(),
-                'candles': serializable_candles
-            }
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f)
-        except Exception as e:
-            self.logger.error(f"Error writing to cache file: {e}")
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (product_id, granularity, int(candle['start']), candle['low'], candle['high'],
+                             candle['open'], candle['close'], candle['volume'], fetched_at)
+                            for candle in candles
+                        ],
+                    )
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO fetched_ranges VALUES (?, ?, ?, ?, ?)",
+                        (product_id, granularity, start, end, fetched_at),
+                    )
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing to candle cache: {e}")
+
+    def _fetch_chunk(self, product_id: str, start: int, end: int, granularity: str) -> Optional[List[dict]]:
+        """Fetch one window of candles from the API and cache it; None if the request failed."""
+        _rate_limiter.acquire()
+        try:
+            candles = market_data.get_candles(
+                self.client,
+                product_id=product_id,
+                start=start,
+                end=end,
+                granularity=granularity
+            )
+        except requests.exceptions.HTTPError as e:
+            self.logger.error(f"Error fetching candle data: {e}", exc_info=True)
+            return None
+        
+        self._throttle(candles)
+        
+        # Convert candles to dictionaries before caching
+        candle_dicts = [self._convert_candle_to_dict(candle) for candle in candles['candles']]
+        
+        # Only cache if not in the current time period
+        current_time = int(time.time())
+        if current_time - end >= FINALIZED_AGE:  # Not within the last hour
+            self._cache_data(product_id, start, end, granularity, candle_dicts)
+        return candle_dicts
+
+    def _throttle(self, response):
+        """Pause the rate limiter until the quota resets if the response says it is nearly spent."""
+        remaining = getattr(response, 'rate_limit_remaining', None)  # set only with rate_limit_headers=True
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+            reset = float(getattr(response, 'rate_limit_reset', None) or 0)
+        except (TypeError, ValueError):
+            return
+        if remaining > RATE_LIMIT_RESERVE:
+            return
+        # The reset is either an epoch timestamp or a number of seconds from now
+        wait = reset - time.time() if reset > 1e9 else reset
+        wait = max(wait, 1.0 / FETCH_RATE_PER_SECOND)
+        self.logger.debug(f"Rate limit nearly spent ({remaining} left), pausing requests for {wait:.2f}s")
+        _rate_limiter.pause(wait)
 
     def get_historical_data(self, product_id: str, start_date: datetime, end_date: datetime, granularity: str = "ONE_HOUR") -> List[dict]:
-        all_candles = []
-        current_start = start_date
         chunk_size_hours = CHUNK_SIZE_CANDLES.get(granularity, 300)  # Default to 300 hours for ONE_HOUR
-        chunk_size = timedelta(hours=chunk_size_hours)
+        chunk_seconds = chunk_size_hours * 3600
 
-        # Track unique candles to avoid duplicates
-        seen_candles = set()
+        # Unique candles by start time; a later chunk's copy of a bar replaces an earlier one
+        candles_by_start = {}
         
         # Track data sources for summary
         cached_ranges = []
         fetched_ranges = []
 
-        while current_start < end_date:
-            current_end = min(current_start + chunk_size, end_date)
-            start = int(current_start.timestamp())
-            end = int(current_end.timestamp())
+        # Split the range into request-sized windows and look each one up in the cache.
+        # Window edges sit on a fixed grid of chunk_seconds rather than at start_ts, so
+        # ranges computed from "now" map onto the same cached windows on every run
+        start_ts = int(start_date.timestamp())
+        end_ts = int(end_date.timestamp())
+        windows = []
+        if start_ts < end_ts:
+            first_edge = start_ts - start_ts % chunk_seconds
+            # sqlite3 binds Python ints only, hence tolist()
+            edges = np.append(np.arange(first_edge, end_ts, chunk_seconds, dtype=np.int64), end_ts).tolist()
+            windows = list(zip(edges[:-1], edges[1:]))
+        now = time.time()
+        cached = [self._get_cached_data(product_id, start, end, granularity, now) for start, end in windows]
+        
+        # Fetching is bound by API latency, so the misses are requested concurrently; the
+        # shared token bucket keeps the request rate under the API limit
+        misses = [window for window, cached_candles in zip(windows, cached) if cached_candles is None]
+        fetched = {}
+        if misses:
+            with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(misses))) as executor:
+                results = executor.map(lambda window: self._fetch_chunk(product_id, *window, granularity), misses)
+                fetched = dict(zip(misses, results))
 
+        # Merge in window order
+        for (start, end), cached_candles in zip(windows, cached):
             # Format timestamps for logging
             start_str = datetime.fromtimestamp(start).strftime('%Y-%m-%d %H:%M:%S')
             end_str = datetime.fromtimestamp(end).strftime('%Y-%m-%d %H:%M:%S')
             time_range = (start_str, end_str)
 
-            # Try to get data from cache first
-            cache_key = self._get_cache_key(product_id, start, end, granularity)
-            cached_candles = self._get_cached_data(cache_key, end)
-
+            candles = cached_candles if cached_candles is not None else fetched[(start, end)]
+            if candles is None:  # the fetch failed and was logged
+                continue
+            
+            prev_count = len(candles_by_start)
+            for candle in candles:
+                # The first window may reach back before start_ts
+                if start_ts <= int(candle['start']) <= end_ts:
+                    candles_by_start[candle['start']] = candle
+            new_count = len(candles_by_start) - prev_count
+            
             if cached_candles is not None:
-                # Add only unseen candles
-                new_count = 0
-                for candle in cached_candles:
-                    candle_key = (candle['start'], candle['close'])
-                    if candle_key not in seen_candles:
-                        all_candles.append(candle)
-                        seen_candles.add(candle_key)
-                        new_count += 1
                 cached_ranges.append((time_range, new_count))
                 self.logger.debug(f"Retrieved {new_count} unique candles from cache for {product_id}")
             else:
-                try:
-                    candles = market_data.get_candles(
-                        self.client,
-                        product_id=product_id,
-                        start=start,
-                        end=end,
-                        granularity=granularity
-                    )
-                    # Convert candles to dictionaries before caching
-                    candle_dicts = [self._convert_candle_to_dict(candle) for candle in candles['candles']]
-                    
-                    # Add only unseen candles
-                    new_candles = []
-                    for candle in candle_dicts:
-                        candle_key = (candle['start'], candle['close'])
-                        if candle_key not in seen_candles:
-                            new_candles.append(candle)
-                            seen_candles.add(candle_key)
-                    
-                    # Only cache if not in the current time period
-                    current_time = int(time.time())
-                    if current_time - end >= 3600:  # Not within the last hour
-                        self._cache_data(cache_key, candle_dicts)
-                    
-                    all_candles.extend(new_candles)
-                    fetched_ranges.append((time_range, len(new_candles)))
-                    self.logger.debug(f"Fetched {len(new_candles)} new candles from API for {product_id}")
-                    time.sleep(0.5)  # Add a small delay to avoid rate limiting
-                except requests.exceptions.HTTPError as e:
-                    self.logger.error(f"Error fetching candle data: {e}", exc_info=True)
-
-            current_start = current_end
+                fetched_ranges.append((time_range, new_count))
+                self.logger.debug(f"Fetched {new_count} new candles from API for {product_id}")
 
         # Sort the candles by their start time to ensure they are in chronological order
-        all_candles.sort(key=lambda x: x['start'])
+        all_candles = sorted(candles_by_start.values(), key=itemgetter('start'))
         
         # Log summary of data sources with grouping
         def log_grouped_ranges(ranges, source_type):
@@ -224,9 +331,32 @@ class HistoricalData:
         
         return all_candles
 
+    def get_historical_columns(self, product_id: str, start_date: datetime, end_date: datetime, granularity: str = "ONE_HOUR") -> Dict[str, np.ndarray]:
+        """
+        Same as get_historical_data, but returned column-wise as numeric arrays ({field: array}).
+
+        'start'/'time' are int64 Unix timestamps and the prices and volume float64. The API's
+        decimal strings are parsed by NumPy in one pass per column, and a dict of arrays is
+        pandas' fast construction path.
+        """
+        candles = self.get_historical_data(product_id, start_date, end_date, granularity)
+        columns = {}
+        for field in CANDLE_FIELDS:
+            if field == 'time':
+                # 'time' is always a copy of 'start'; reuse the parsed timestamps
+                columns[field] = columns['start']
+                continue
+            values = np.array([candle[field] for candle in candles], dtype=str)
+            columns[field] = values.astype(np.int64 if field == 'start' else np.float64)
+        return columns
+
     def clear_cache(self):
         """Clear all cached candle data."""
         try:
+            with self._db_lock:
+                self._db.execute("DELETE FROM candles")
+                self._db.execute("DELETE FROM fetched_ranges")
+            # Per-chunk JSON files left by the cache's previous layout
             for cache_file in os.listdir(CACHE_DIR):
                 if cache_file.endswith('.json'):
                     os.remove(os.path.join(CACHE_DIR, cache_file))
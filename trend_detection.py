@@ -5,13 +5,21 @@ from datetime import datetime, timedelta, UTC
 from services.coinbase.coinbaseservice import CoinbaseService
 from config import API_KEY_PERPS, API_SECRET_PERPS
 import logging
-import time
+from functools import lru_cache
+from indicators import atr_wilder, ema, rolling_mean, rolling_mean_std, rsi_wilder, true_range
 
 # Set up logging
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+@lru_cache(maxsize=1)
+def _get_cb() -> CoinbaseService:
+    """Shared CoinbaseService, so repeated fetches reuse its connection pool and candle cache"""
+    return CoinbaseService(API_KEY_PERPS, API_SECRET_PERPS)
+
 def fetch_coinbase_data(product_id: str = 'BTC-USDC', 
                        start_date: Optional[str] = None,
                        end_date: Optional[str] = None) -> pd.DataFrame:
@@ -24,129 +32,43 @@ def fetch_coinbase_data(product_id: str = 'BTC-USDC',
         end_date: Optional end date in 'YYYY-MM-DD' format
         
     Returns:
-        DataFrame with OHLCV data
+        DataFrame with float32 OHLCV data
     """
     logger.info(f"Fetching data for {product_id}")
-    cb = CoinbaseService(API_KEY_PERPS, API_SECRET_PERPS)
+    cb = _get_cb()
     
     if start_date and end_date:
         start = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=UTC)
         end = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=UTC)
     else:
-        # Default to last 8000 1-hour candles
+        # Default to last 8000 1-hour candles. Starting on an hour boundary keeps the first
+        # candle, and the cached fetch windows, the same between runs within the hour
         now = datetime.now(UTC)
         end = now
-        start = now - timedelta(hours=8000)
+        start = (now - timedelta(hours=8000)).replace(minute=0, second=0, microsecond=0)
     
     logger.info(f"Fetching data from {start} to {end}")
     
-    # Initialize empty list to store all candles
-    all_candles = []
-    current_end = end
-    max_retries = 3
-    
-    # Fetch data in chunks of 350 candles (maximum allowed by API)
-    while current_end > start:
-        retries = 0
-        while retries < max_retries:
-            try:
-                # Calculate start time for this chunk (350 candles * 1 hour = 350 hours)
-                chunk_start = current_end - timedelta(hours=350)
-                if chunk_start < start:
-                    chunk_start = start
-                    
-                # Get raw data for this chunk
-                response = cb.client.get_public_candles(
-                    product_id=product_id,
-                    start=int(chunk_start.timestamp()),
-                    end=int(current_end.timestamp()),
-                    granularity='ONE_HOUR'
-                )
-                
-                # Handle the Coinbase API response
-                if hasattr(response, 'candles'):
-                    candles = response.candles
-                elif isinstance(response, dict) and 'candles' in response:
-                    candles = response['candles']
-                elif isinstance(response, list):
-                    candles = response
-                else:
-                    logger.error(f"Unexpected API response format: {type(response)}")
-                    retries += 1
-                    time.sleep(1)
-                    continue
-                
-                if not candles:
-                    logger.warning(f"No candles in chunk from {chunk_start} to {current_end}")
-                    break
-                
-                # Convert each candle to a dictionary
-                for candle in candles:
-                    if hasattr(candle, 'to_dict'):
-                        candle_dict = candle.to_dict()
-                    elif isinstance(candle, dict):
-                        candle_dict = candle
-                    elif isinstance(candle, (list, tuple)) and len(candle) >= 6:
-                        candle_dict = {
-                            'start': candle[0],
-                            'open': candle[1],
-                            'high': candle[2],
-                            'low': candle[3],
-                            'close': candle[4],
-                            'volume': candle[5]
-                        }
-                    else:
-                        logger.error(f"Unexpected candle format: {type(candle)}")
-                        continue
-                    
-                    all_candles.append(candle_dict)
-                
-                break  # Success, exit retry loop
-                
-            except Exception as e:
-                logger.error(f"Error fetching data chunk (attempt {retries + 1}/{max_retries}): {e}")
-                retries += 1
-                if retries < max_retries:
-                    time.sleep(2 ** retries)  # Exponential backoff
-                continue
-        
-        if retries == max_retries:
-            logger.error(f"Failed to fetch data chunk after {max_retries} attempts")
-            break
-            
-        # Update end time for next chunk
-        current_end = chunk_start
-        
-        # If we've reached the start time, break
-        if chunk_start <= start:
-            break
+    # Finalized candles come from the local candle cache; only missing windows hit the API
+    columns = cb.historical_data.get_historical_columns(product_id, start, end, 'ONE_HOUR')
     
-    if not all_candles:
+    if not len(columns['start']):
         logger.error("No candles fetched from API")
-        return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
-    
-    # Create DataFrame from all candles
-    df = pd.DataFrame(all_candles)
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
     
-    # Convert string columns to numeric
-    numeric_columns = ['open', 'high', 'low', 'close', 'volume']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Handle timestamp conversion - convert to numeric first to avoid warning
-    df['start'] = pd.to_numeric(df['start'], errors='coerce')
-    df['start'] = pd.to_datetime(df['start'], unit='s', utc=True)
-    df.set_index('start', inplace=True)
-    # Ensure DataFrame is sorted by index (datetime)
-    df.sort_index(inplace=True)
+    # The columns arrive parsed and sorted by start time
+    index = pd.DatetimeIndex(pd.to_datetime(columns['start'], unit='s', utc=True), name='start')
+    # float32 is ample for hourly EMA/ATR/RSI/BB and halves the memory traffic of the
+    # indicator passes; the kernels keep their running sums in float64
+    df = pd.DataFrame({col: columns[col].astype(np.float32) for col in OHLCV_COLUMNS}, index=index)
     
     logger.info(f"Fetched {len(df)} candles")
     # Print the date range of the DataFrame after fetching data
     logger.info(f"Data covers from {df.index.min()} to {df.index.max()}")
     return df
 
-def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
+def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14,
+                  wilder: bool = False) -> pd.Series:
     """
     Calculate Average True Range (ATR).
     
@@ -155,34 +77,82 @@ def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int
         low: Low prices
         close: Close prices
         period: ATR period (default: 14)
+        wilder: Use Wilder's smoothing (as talib.ATR) instead of a simple moving average
+            of the true range. The detectors' thresholds are tuned on the SMA version.
         
     Returns:
         Series containing ATR values
     """
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(period).mean()
+    if wilder:
+        return pd.Series(atr_wilder(high.to_numpy(), low.to_numpy(), close.to_numpy(), period=period),
+                         index=close.index)
+    # The first bar has no previous close, so its true range is high - low
+    tr = true_range(high.to_numpy(), low.to_numpy(), close.to_numpy())
+    return pd.Series(rolling_mean(tr, period), index=close.index)
 
-def calculate_rsi(close: pd.Series, period: int = 14) -> pd.Series:
+def calculate_rsi(close: pd.Series, period: int = 14, wilder: bool = False) -> pd.Series:
     """
     Calculate Relative Strength Index (RSI).
     
     Args:
         close: Close prices
         period: RSI period (default: 14)
+        wilder: Use Wilder's smoothing of gains and losses (as talib.RSI) instead of
+            simple moving averages. The detectors' thresholds are tuned on the SMA version.
         
     Returns:
         Series containing RSI values
     """
-    delta = close.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    if wilder:
+        return pd.Series(rsi_wilder(close.to_numpy(), period=period), index=close.index)
+    values = close.to_numpy()
+    # The first bar counts as no change, as it did with the masked pandas version
+    delta = np.diff(values, prepend=values[:1])
+    gain = rolling_mean(np.maximum(delta, 0.0), period)
+    loss = rolling_mean(np.maximum(-delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+    return pd.Series(100 - (100 / (1 + rs)), index=close.index)
+
+# ATR/RSI(14) depend on the last 15 closes and the Bollinger Bands on the last 20, so their
+# latest values computed over this many trailing bars equal those over the full history.
+# EMA50 has unbounded memory and is always computed over the full history
+INDICATOR_TAIL = 40
+
+def _downtrend_indicators(df: pd.DataFrame, tail: Optional[int] = None) -> dict:
+    """
+    EMA50, ATR and ATR% arrays used by detect_clear_downtrend.
+    
+    With `tail`, ATR/ATR% cover only the last `tail` bars (enough for their latest values).
+    """
+    ema50 = ema(df['close'].to_numpy(), 50)
+    if tail is not None:
+        df = df.iloc[-tail:]
+    close = df['close'].to_numpy()
+    atr = calculate_atr(df['high'], df['low'], df['close']).to_numpy()
+    return {'ema50': ema50, 'atr': atr, 'atr_pct': atr / close * 100}
 
-def detect_clear_downtrend(df: pd.DataFrame) -> Tuple[bool, dict]:
+def _oversold_indicators(df: pd.DataFrame, tail: Optional[int] = None) -> dict:
+    """
+    RSI and Bollinger Band (20, 2) arrays used by detect_oversold_reversal.
+    
+    With `tail`, the arrays cover only the last `tail` bars (enough for their latest values).
+    """
+    if tail is not None:
+        df = df.iloc[-tail:]
+    bb_middle, bb_std = rolling_mean_std(df['close'].to_numpy(), 20)
+    return {
+        'rsi': calculate_rsi(df['close']).to_numpy(),
+        'bb_middle': bb_middle,
+        'bb_std': bb_std,
+        'bb_lower': bb_middle - 2 * bb_std,
+    }
+
+def _compute_indicators(df: pd.DataFrame, tail: Optional[int] = None) -> dict:
+    """All indicator arrays of both detectors, computed once so they can share them"""
+    return {**_downtrend_indicators(df, tail), **_oversold_indicators(df, tail)}
+
+def detect_clear_downtrend(df: pd.DataFrame, indicators: Optional[dict] = None) -> Tuple[bool, dict]:
     """
     Detect if there is a clear downtrend in the market.
     
@@ -194,27 +164,27 @@ def detect_clear_downtrend(df: pd.DataFrame) -> Tuple[bool, dict]:
     Args:
         df: DataFrame containing OHLCV data with columns:
             - open, high, low, close, volume
+        indicators: Optional precomputed indicator arrays from _compute_indicators(df)
             
     Returns:
         Tuple[bool, dict]: (is_downtrend, metrics)
     """
-    df = df.copy()
     # Calculate technical indicators
-    df['EMA50'] = df['close'].ewm(span=50, adjust=False).mean()
-    df['ATR'] = calculate_atr(df['high'], df['low'], df['close'])
-    df['ATR%'] = df['ATR'] / df['close'] * 100
+    if indicators is None:
+        indicators = _downtrend_indicators(df, INDICATOR_TAIL)
+    close = df['close'].to_numpy()
+    ema50 = indicators['ema50']
+    atr_pct = indicators['atr_pct']
     
     # Check if last 5 closes are below EMA50
-    ema_check = (df['close'].iloc[-5:] < df['EMA50'].iloc[-5:]).all()
+    ema_check = (close[-5:] < ema50[-5:]).all()
     
     # Check lower lows and lower highs in last 5 bars
-    lows = df['low'].iloc[-5:]
-    highs = df['high'].iloc[-5:]
-    lower_lows = all(lows.iloc[i] < lows.iloc[i-1] for i in range(1, len(lows)))
-    lower_highs = all(highs.iloc[i] < highs.iloc[i-1] for i in range(1, len(highs)))
+    lower_lows = bool(np.all(np.diff(df['low'].to_numpy()[-5:]) < 0))
+    lower_highs = bool(np.all(np.diff(df['high'].to_numpy()[-5:]) < 0))
     
     # ATR filter
-    atr_check = df['ATR%'].iloc[-1] > 0.7
+    atr_check = atr_pct[-1] > 0.7
     
     # Collect metrics
     metrics = {
@@ -222,14 +192,14 @@ def detect_clear_downtrend(df: pd.DataFrame) -> Tuple[bool, dict]:
         'lower_lows': lower_lows,
         'lower_highs': lower_highs,
         'atr_check': atr_check,
-        'current_atr%': df['ATR%'].iloc[-1],
-        'current_close': df['close'].iloc[-1],
-        'current_ema50': df['EMA50'].iloc[-1]
+        'current_atr%': atr_pct[-1],
+        'current_close': close[-1],
+        'current_ema50': ema50[-1]
     }
     
     return ema_check and lower_lows and lower_highs and atr_check, metrics
 
-def detect_oversold_reversal(df: pd.DataFrame) -> Tuple[bool, dict]:
+def detect_oversold_reversal(df: pd.DataFrame, indicators: Optional[dict] = None) -> Tuple[bool, dict]:
     """
     Detect potential oversold reversal conditions.
     
@@ -240,103 +210,160 @@ def detect_oversold_reversal(df: pd.DataFrame) -> Tuple[bool, dict]:
     Args:
         df: DataFrame containing OHLCV data with columns:
             - open, high, low, close, volume
+        indicators: Optional precomputed indicator arrays from _compute_indicators(df)
             
     Returns:
         Tuple[bool, dict]: (is_oversold, metrics)
     """
-    df = df.copy()
     # Calculate technical indicators
-    df['RSI'] = calculate_rsi(df['close'])
-    
-    # Calculate Bollinger Bands
-    df['BB_middle'] = df['close'].rolling(20).mean()
-    df['BB_std'] = df['close'].rolling(20).std()
-    df['BB_lower'] = df['BB_middle'] - 2 * df['BB_std']
+    if indicators is None:
+        indicators = _oversold_indicators(df, INDICATOR_TAIL)
+    close = df['close'].iloc[-1]
+    rsi = indicators['rsi'][-1]
+    bb_lower = indicators['bb_lower'][-1]
     
     # Check conditions
-    rsi_check = df['RSI'].iloc[-1] < 25  # Stricter RSI threshold
-    bb_check = df['close'].iloc[-1] <= df['BB_lower'].iloc[-1] * 0.995  # Price must be at least 0.5% below BB_lower
+    rsi_check = rsi < 25  # Stricter RSI threshold
+    bb_check = close <= bb_lower * 0.995  # Price must be at least 0.5% below BB_lower
     
     # Calculate how far price is below BB_lower
-    bb_distance = ((df['close'].iloc[-1] - df['BB_lower'].iloc[-1]) / df['BB_lower'].iloc[-1]) * 100
+    bb_distance = ((close - bb_lower) / bb_lower) * 100
     
     # Collect metrics
     metrics = {
         'rsi_check': rsi_check,
         'bb_check': bb_check,
-        'current_rsi': df['RSI'].iloc[-1],
-        'current_close': df['close'].iloc[-1],
-        'current_bb_lower': df['BB_lower'].iloc[-1],
+        'current_rsi': rsi,
+        'current_close': close,
+        'current_bb_lower': bb_lower,
         'bb_distance_pct': bb_distance  # Added to show how far price is below BB_lower
     }
     
     return rsi_check and bb_check, metrics
 
-def analyze_market_conditions(df: pd.DataFrame) -> Tuple[bool, bool, dict, dict]:
+def analyze_market_conditions(df: pd.DataFrame, indicators: Optional[dict] = None) -> Tuple[bool, bool, dict, dict]:
     """
     Analyze market conditions for both downtrend and oversold reversal.
     
     Args:
         df: DataFrame containing OHLCV data with columns:
             - open, high, low, close, volume
+        indicators: Optional precomputed indicator arrays from _compute_indicators(df)
             
     Returns:
         Tuple[bool, bool, dict, dict]: (is_downtrend, is_oversold_reversal, downtrend_metrics, oversold_metrics)
     """
-    is_downtrend, downtrend_metrics = detect_clear_downtrend(df)
-    is_oversold_reversal, oversold_metrics = detect_oversold_reversal(df)
+    # Both detectors read from one set of indicator arrays; df itself is left untouched
+    if indicators is None:
+        indicators = _compute_indicators(df, INDICATOR_TAIL)
+    is_downtrend, downtrend_metrics = detect_clear_downtrend(df, indicators)
+    is_oversold_reversal, oversold_metrics = detect_oversold_reversal(df, indicators)
     return is_downtrend, is_oversold_reversal, downtrend_metrics, oversold_metrics
 
-def find_last_downtrend_signal(df: pd.DataFrame) -> Optional[Tuple[pd.Timestamp, dict]]:
+def _trailing_all(mask: np.ndarray, n: int) -> np.ndarray:
+    """True at each bar where `mask` holds for that bar and the n - 1 before it"""
+    counts = np.cumsum(mask, dtype=np.int64)
+    out = np.zeros(len(mask), dtype=bool)
+    if len(mask) >= n:
+        out[n - 1] = counts[n - 1] == n
+        out[n:] = counts[n:] - counts[:-n] == n
+    return out
+
+def _oversold_hits(df: pd.DataFrame, indicators: dict, first_bar: int) -> np.ndarray:
+    """Positions from `first_bar` on where detect_oversold_reversal would fire"""
+    close = df['close'].to_numpy()
+    signal = (indicators['rsi'] < 25) & (close <= indicators['bb_lower'] * 0.995)
+    signal[:first_bar] = False
+    return np.flatnonzero(signal)
+
+def _oversold_metrics(df: pd.DataFrame, indicators: dict, hits: np.ndarray) -> dict:
+    """detect_oversold_reversal's metrics for the bars at positions `hits`, as {metric: array}"""
+    close = df['close'].to_numpy()[hits]
+    rsi = indicators['rsi'][hits]
+    bb_lower = indicators['bb_lower'][hits]
+    return {
+        'rsi_check': rsi < 25,
+        'bb_check': close <= bb_lower * 0.995,
+        'current_rsi': rsi,
+        'current_close': close,
+        'current_bb_lower': bb_lower,
+        'bb_distance_pct': ((close - bb_lower) / bb_lower) * 100
+    }
+
+def find_last_downtrend_signal(df: pd.DataFrame, indicators: Optional[dict] = None) -> Optional[Tuple[pd.Timestamp, dict]]:
     """
     Find the last time a clear downtrend was detected in the DataFrame.
     Returns the timestamp and metrics if found, else None.
+    
+    `indicators` may be the full-history arrays of _compute_indicators(df) (no tail).
     """
     min_history = 50  # for EMA50 and ATR
     window_size = 5
     if len(df) < min_history + window_size - 1:
         return None
-    last_signal = None
-    for i in range(min_history + window_size - 1, len(df)):
-        window = df.iloc[:i+1]
-        is_downtrend, metrics = detect_clear_downtrend(window)
-        if is_downtrend:
-            last_signal = (window.index[-1], metrics)
-    return last_signal
+    # Indicators are causal, so one pass over the full history gives every bar the value
+    # detect_clear_downtrend would compute on the data up to that bar
+    if indicators is None:
+        indicators = _downtrend_indicators(df)
+    close = df['close'].to_numpy()
+    ema50 = indicators['ema50']
+    atr_pct = indicators['atr_pct']
+    ema_check = _trailing_all(close < ema50, window_size)
+    lower_lows = _trailing_all(np.diff(df['low'].to_numpy(), prepend=np.nan) < 0, window_size - 1)
+    lower_highs = _trailing_all(np.diff(df['high'].to_numpy(), prepend=np.nan) < 0, window_size - 1)
+    signal = ema_check & lower_lows & lower_highs & (atr_pct > 0.7)
+    signal[:min_history + window_size - 1] = False
+    hits = np.flatnonzero(signal)
+    if not len(hits):
+        return None
+    i = hits[-1]
+    metrics = {
+        'ema_check': ema_check[i],
+        'lower_lows': bool(lower_lows[i]),
+        'lower_highs': bool(lower_highs[i]),
+        'atr_check': atr_pct[i] > 0.7,
+        'current_atr%': atr_pct[i],
+        'current_close': close[i],
+        'current_ema50': ema50[i]
+    }
+    return df.index[i], metrics
 
-def find_last_oversold_signal(df: pd.DataFrame) -> Optional[Tuple[pd.Timestamp, dict]]:
+def find_last_oversold_signal(df: pd.DataFrame, indicators: Optional[dict] = None) -> Optional[Tuple[pd.Timestamp, dict]]:
     """
     Find the last time an oversold reversal was detected in the DataFrame.
     Returns the timestamp and metrics if found, else None.
+    
+    `indicators` may be the full-history arrays of _compute_indicators(df) (no tail).
     """
     min_history = 20  # for Bollinger Bands
     rsi_period = 14
     if len(df) < min_history + rsi_period - 1:
         return None
-    last_signal = None
-    for i in range(min_history + rsi_period - 1, len(df)):
-        window = df.iloc[:i+1]
-        is_oversold, metrics = detect_oversold_reversal(window)
-        if is_oversold:
-            last_signal = (window.index[-1], metrics)
-    return last_signal
+    if indicators is None:
+        indicators = _oversold_indicators(df)
+    hits = _oversold_hits(df, indicators, min_history + rsi_period - 1)
+    if not len(hits):
+        return None
+    metrics = _oversold_metrics(df, indicators, hits[-1:])
+    return df.index[hits[-1]], {key: values[0] for key, values in metrics.items()}
 
-def find_all_oversold_signals(df: pd.DataFrame) -> list:
+def find_all_oversold_signals(df: pd.DataFrame, indicators: Optional[dict] = None) -> list:
     """
     Find all timestamps where an oversold reversal was detected in the DataFrame.
     Returns a list of (timestamp, metrics) tuples.
+    
+    `indicators` may be the full-history arrays of _compute_indicators(df) (no tail).
     """
     min_history = 20  # for Bollinger Bands
     rsi_period = 14
-    signals = []
     if len(df) < min_history + rsi_period - 1:
-        return signals
-    for i in range(min_history + rsi_period - 1, len(df)):
-        window = df.iloc[:i+1]
-        is_oversold, metrics = detect_oversold_reversal(window)
-        if is_oversold:
-            signals.append((window.index[-1], metrics))
-    return signals
+        return []
+    if indicators is None:
+        indicators = _oversold_indicators(df)
+    hits = _oversold_hits(df, indicators, min_history + rsi_period - 1)
+    # Metrics are computed column-wise over all hits; only the final dicts are per signal
+    metrics = _oversold_metrics(df, indicators, hits)
+    return [(ts, dict(zip(metrics, row))) for ts, row in zip(df.index[hits], zip(*metrics.values()))]
 
 # Example usage:
 if __name__ == "__main__":
@@ -347,8 +374,11 @@ if __name__ == "__main__":
     today_str = today.strftime('%Y-%m-%d')
     df = fetch_coinbase_data('BTC-USDC', start_date=two_months_ago, end_date=today_str)
     
+    # Every check below reads from one full-history pass over the indicators
+    indicators = _compute_indicators(df)
+    
     # Analyze market conditions
-    is_downtrend, is_oversold_reversal, downtrend_metrics, oversold_metrics = analyze_market_conditions(df)
+    is_downtrend, is_oversold_reversal, downtrend_metrics, oversold_metrics = analyze_market_conditions(df, indicators)
     
     # Print results
     logger.info("\nMarket Analysis Results:")
@@ -374,8 +404,8 @@ if __name__ == "__main__":
         logger.info(f"Current RSI: {oversold_metrics['current_rsi']:.2f}")
 
     # Find last time downtrend and oversold reversal conditions were met
-    last_downtrend = find_last_downtrend_signal(df)
-    last_oversold = find_last_oversold_signal(df)
+    last_downtrend = find_last_downtrend_signal(df, indicators)
+    last_oversold = find_last_oversold_signal(df, indicators)
 
     logger.info("\n" + "=" * 50)
     if last_downtrend:
@@ -396,7 +426,7 @@ if __name__ == "__main__":
         logger.info("No oversold reversal detected in the past.")
 
     # Print the last 3 oversold reversal signals for clarity (newest first)
-    all_oversold_signals = find_all_oversold_signals(df)
+    all_oversold_signals = find_all_oversold_signals(df, indicators)
     logger.info("\nLast 3 oversold reversal signals in the period (newest first):")
     if all_oversold_signals:
         for ts, metrics in reversed(all_oversold_signals[-3:]):
@@ -408,10 +438,10 @@ if __name__ == "__main__":
 
     # Debug: Print latest RSI, close, and lower Bollinger Band values for last 10 candles
     logger.info("\nLatest 10 candles RSI, close, BB_lower:")
-    df_debug = df.copy()
-    df_debug['RSI'] = calculate_rsi(df_debug['close'])
-    df_debug['BB_middle'] = df_debug['close'].rolling(20).mean()
-    df_debug['BB_std'] = df_debug['close'].rolling(20).std()
-    df_debug['BB_lower'] = df_debug['BB_middle'] - 2 * df_debug['BB_std']
-    for idx, row in df_debug.iloc[-10:].iterrows():
-        logger.info(f"{idx}: close={row['close']}, RSI={row['RSI']}, BB_lower={row['BB_lower']}") 
\ No newline at end of file
+    df_debug = df.iloc[-10:].assign(
+        RSI=indicators['rsi'][-10:],
+        BB_middle=indicators['bb_middle'][-10:],
+        BB_std=indicators['bb_std'][-10:],
+        BB_lower=indicators['bb_lower'][-10:],
+    )
+    logger.info("\n" + df_debug[['close', 'RSI', 'BB_lower']].to_string()) 
\ No newline at end of file